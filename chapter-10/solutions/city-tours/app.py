@@ -3,14 +3,230 @@
 # reverse proxy behavior rather than persistence.
 
 from __future__ import annotations
-from flask import Flask, jsonify, request, abort
-from typing import Dict, Any, List
+from flask import Flask, Response, jsonify, request, abort
+from typing import Dict, Any, Iterator, List, Tuple
+from itertools import islice
+import base64
 import datetime as dt
+import json
 import seed_data as data
+import storage
+from response_cache import ResponseCache
 
 
-def create_app() -> Flask:
+MAX_PAGE_SIZE = 1000
+MAX_BATCH_SIZE = 10000
+MAX_AVAILABILITY_DAYS = 366
+BOOKING_FIELDS = {"tourId", "userId", "date"}
+
+
+class BadRequest(ValueError):
+    pass
+
+
+class InvalidBooking(ValueError):
+    def __init__(self, message: str, status: int) -> None:
+        super().__init__(message)
+        self.status = status
+
+
+def _parse_booking(body: Any) -> Tuple[int, str, dt.date]:
+    """Validate one booking body against the catalog; returns (user_id, tour_id, date)."""
+    if not isinstance(body, dict) or not BOOKING_FIELDS.issubset(body.keys()):
+        raise InvalidBooking(f"Missing fields. Required: {sorted(list(BOOKING_FIELDS))}", 400)
+    # Validate tour & user existence in monolith for now
+    if not isinstance(body["tourId"], str) or not data.get_tour(body["tourId"]):
+        raise InvalidBooking("Unknown tourId", 422)
+    try:
+        user_id = int(body["userId"])
+    except (TypeError, ValueError):
+        raise InvalidBooking("Unknown userId", 422)
+    if not data.get_user(user_id):
+        raise InvalidBooking("Unknown userId", 422)
+    try:
+        date_obj = dt.date.fromisoformat(body["date"])
+    except Exception:
+        raise InvalidBooking("Invalid date format. Use YYYY-MM-DD", 400)
+    return user_id, body["tourId"], date_obj
+
+
+def _parse_batch(mimetype: str, raw: bytes) -> List[Any]:
+    """Booking bodies from a JSON array or an NDJSON body (one booking per line)."""
+    if mimetype == "application/x-ndjson":
+        items: List[Any] = []
+        for line in raw.decode("utf-8", "replace").splitlines():
+            if line.strip():
+                try:
+                    items.append(json.loads(line))
+                except ValueError:
+                    items.append(None)  # reported per item as missing fields
+        return items
+    try:
+        body = json.loads(raw)
+    except ValueError:
+        body = None
+    if not isinstance(body, list):
+        raise BadRequest("Expected a JSON array or NDJSON of bookings")
+    return body
+
+
+def _create_batch(items: List[Any]) -> Tuple[Dict[str, Any], int]:
+    if len(items) > MAX_BATCH_SIZE:
+        return {"error": f"At most {MAX_BATCH_SIZE} bookings per batch"}, 413
+    # Validate everything in one pass, then commit the valid ones in a single write
+    results: List[Dict[str, Any]] = []
+    valid: List[Tuple[int, Tuple[int, str, dt.date]]] = []
+    for index, body in enumerate(items):
+        try:
+            valid.append((index, _parse_booking(body)))
+            results.append({})
+        except InvalidBooking as err:
+            results.append({"index": index, "status": err.status, "error": str(err)})
+    docs = data.add_bookings(parsed for _, parsed in valid)
+    created = 0
+    for (index, (_, tour_id, date_obj)), doc in zip(valid, docs):
+        if doc is None:
+            results[index] = {"index": index, "status": 409,
+                              "error": f"Tour {tour_id} is fully booked on {date_obj.isoformat()}"}
+            continue
+        results[index] = {"index": index, "status": 201, "booking": doc}
+        created += 1
+    return {
+        "created": created,
+        "failed": len(items) - created,
+        "results": results,
+    }, 200
+
+
+def _availability_range(args: Any) -> Tuple[dt.date, dt.date]:
+    """Validated [from, to] dates; defaults to the next 30 days."""
+    try:
+        start = dt.date.fromisoformat(args["from"]) if args.get("from") else dt.date.today()
+        end = dt.date.fromisoformat(args["to"]) if args.get("to") else start + dt.timedelta(days=30)
+    except ValueError:
+        raise BadRequest("Invalid date format. Use YYYY-MM-DD")
+    if end < start:
+        raise BadRequest("'to' must not be before 'from'")
+    if (end - start).days >= MAX_AVAILABILITY_DAYS:
+        raise BadRequest(f"Date range is limited to {MAX_AVAILABILITY_DAYS} days")
+    return start, end
+
+
+def _availability_body(tour: Dict[str, Any], start: dt.date, end: dt.date) -> Dict[str, Any]:
+    return {
+        "tourId": tour["id"],
+        "capacity": tour.get("capacity"),
+        "from": start.isoformat(),
+        "to": end.isoformat(),
+        "dates": data.get_availability(tour["id"], start, end),
+    }
+
+
+def _encode_cursor(value: Any) -> str:
+    return base64.urlsafe_b64encode(json.dumps(value).encode()).decode().rstrip("=")
+
+
+def _decode_cursor(raw: str | None) -> Any:
+    if not raw:
+        return None
+    try:
+        return json.loads(base64.urlsafe_b64decode(raw + "=" * (-len(raw) % 4)))
+    except ValueError:
+        raise BadRequest("Invalid cursor")
+
+
+def _paging_args(req: Any, cursor_type: type) -> Tuple[int | None, Any]:
+    """(limit, decoded cursor) from the query string; limit is None when not paging."""
+    limit = req.args.get("limit")
+    if limit is not None:
+        try:
+            limit = int(limit)
+        except ValueError:
+            raise BadRequest("limit must be an integer")
+        if not 1 <= limit <= MAX_PAGE_SIZE:
+            raise BadRequest(f"limit must be between 1 and {MAX_PAGE_SIZE}")
+    cursor = _decode_cursor(req.args.get("cursor"))
+    if cursor is not None and type(cursor) is not cursor_type:
+        raise BadRequest("Invalid cursor")
+    return limit, cursor
+
+
+def _wants_ndjson(req: Any) -> bool:
+    return (req.args.get("format") == "ndjson"
+            or req.accept_mimetypes.best == "application/x-ndjson")
+
+
+def _wants_listing(req: Any, limit: int | None, cursor: Any) -> bool:
+    """Paging (limit/cursor) or NDJSON streaming requested, rather than the plain array."""
+    return limit is not None or cursor is not None or _wants_ndjson(req)
+
+
+def _ndjson_lines(pairs: Iterator[Tuple[Any, Dict[str, Any]]], limit: int | None) -> Iterator[bytes]:
+    # One record per line, produced lazily so memory stays flat for any listing size
+    for _, doc in islice(pairs, limit):
+        yield (json.dumps(doc, separators=(",", ":")) + "\n").encode()
+
+
+def _page_body(pairs: Iterator[Tuple[Any, Dict[str, Any]]], limit: int | None) -> Dict[str, Any]:
+    items, next_cursor = data.page(pairs, limit or MAX_PAGE_SIZE)
+    return {
+        "items": items,
+        "nextCursor": _encode_cursor(next_cursor) if next_cursor is not None else None,
+    }
+
+
+def _listing(pairs: Iterator[Tuple[Any, Dict[str, Any]]], limit: int | None) -> Response:
+    if _wants_ndjson(request):
+        return Response(_ndjson_lines(pairs, limit), mimetype="application/x-ndjson")
+    return jsonify(_page_body(pairs, limit))
+
+
+def _configure(app: Any, config: Dict[str, Any] | None) -> ResponseCache:
+    """Shared by the Flask and async apps: load config, pick the booking store, and
+    return the response cache wired to catalog change notifications."""
+    # Defaults keep the original in-memory behavior. Override with CITYTOURS_* env vars
+    # (e.g. CITYTOURS_STORAGE_BACKEND=sqlite) or the `config` mapping.
+    app.config.update(
+        STORAGE_BACKEND="memory",
+        MEMORY_LOCK_STRIPES=64,
+        SQLITE_PATH="city-tours.db",
+        SQLITE_BATCH_SIZE=64,
+        SQLITE_FLUSH_INTERVAL=0.05,
+        SYNTHETIC_DATA="",
+        SYNTHETIC_SEED=42,
+    )
+    app.config.from_prefixed_env("CITYTOURS")
+    if config:
+        app.config.update(config)
+    previous = data.use_store(storage.create_store(
+        app.config["STORAGE_BACKEND"],
+        stripes=app.config["MEMORY_LOCK_STRIPES"],
+        path=app.config["SQLITE_PATH"],
+        batch_size=app.config["SQLITE_BATCH_SIZE"],
+        flush_interval=app.config["SQLITE_FLUSH_INTERVAL"],
+    ))
+    previous.close()
+    if app.config["SYNTHETIC_DATA"]:
+        # Load-test dataset, "users:tours:cities:bookings" (see generate_data.py)
+        import generate_data
+        generate_data.generate_from_spec(app.config["SYNTHETIC_DATA"], app.config["SYNTHETIC_SEED"])
+
+    # Read-only catalog/user responses are encoded once and served with ETags. Same
+    # compact bytes jsonify produces outside debug mode.
+    cache = ResponseCache(
+        lambda payload: (app.json.dumps(payload, separators=(",", ":")) + "\n").encode()
+    )
+    data.on_change(cache.invalidate)
+    return cache
+
+
+def create_app(config: Dict[str, Any] | None = None) -> Flask:
     app = Flask(__name__)
+    cache = _configure(app, config)
+
+    @app.errorhandler(BadRequest)
+    def bad_request(err: BadRequest) -> Any:
+        return jsonify({"error": str(err)}), 400
 
     # -----------------
     # Health & metadata
@@ -30,10 +246,14 @@ def create_app() -> Flask:
             "message": "City Tours Monolith",
             "endpoints": [
                 "/catalog/tours?city=paris",
+                "/catalog/tours?city=paris&limit=20&cursor=...",
+                "/catalog/tours/paris-food-101/availability?from=2025-08-01&to=2025-08-31",
                 "/bookings (POST)",
+                "/bookings/batch (POST)",
                 "/bookings?userId=42",
                 "/users/42",
                 "/recommendations?city=paris",
+                "/recommendations?city=paris&userId=42",
                 "/payments/checkout (POST)"
             ]
         })
@@ -46,15 +266,31 @@ def create_app() -> Flask:
         city = request.args.get("city", type=str)
         if not city:
             return jsonify({"error": "Missing required query parameter 'city'"}), 400
-        tours = data.query_tours_by_city(city)
-        return jsonify(tours)
+        city_key = data.normalize_city(city)
+        # Paging (limit/cursor) or NDJSON streaming; the plain array stays cached
+        limit, cursor = _paging_args(request, str)
+        if _wants_listing(request, limit, cursor):
+            return _listing(data.iter_tours_by_city(city_key, after=cursor), limit)
+        # Only known cities are cached, so made-up ones can't grow the cache
+        if city_key not in data.TOURS_BY_CITY:
+            return jsonify([])
+        return cache.respond(("city", city_key), "tours",
+                             lambda: data.query_tours_by_city(city_key))
 
     @app.get("/catalog/tours/<tour_id>")
     def get_tour(tour_id: str) -> Any:
         tour = data.get_tour(tour_id)
         if not tour:
             abort(404, description="Tour not found")
-        return jsonify(tour)
+        return cache.respond(("tour", tour_id), "tour", lambda: tour)
+
+    @app.get("/catalog/tours/<tour_id>/availability")
+    def get_tour_availability(tour_id: str) -> Any:
+        tour = data.get_tour(tour_id)
+        if not tour:
+            abort(404, description="Tour not found")
+        start, end = _availability_range(request.args)
+        return jsonify(_availability_body(tour, start, end))
 
     # ----------------
     # Bookings (slice)
@@ -62,30 +298,33 @@ def create_app() -> Flask:
     @app.post("/bookings")
     def create_booking() -> Any:
         body = request.get_json(silent=True) or {}
-        required = {"tourId", "userId", "date"}
-        if not required.issubset(body.keys()):
-            return jsonify({"error": f"Missing fields. Required: {sorted(list(required))}"}), 400
-        # Validate tour & user existence in monolith for now
-        if not data.get_tour(body["tourId"]):
-            return jsonify({"error": "Unknown tourId"}), 422
-        if not data.get_user(body["userId"]):
-            return jsonify({"error": "Unknown userId"}), 422
         try:
-            date_obj = dt.date.fromisoformat(body["date"])
-        except Exception:
-            return jsonify({"error": "Invalid date format. Use YYYY-MM-DD"}), 400
-        booking = data.add_booking(
-            user_id=int(body["userId"]),
-            tour_id=body["tourId"],
-            date=date_obj
-        )
+            user_id, tour_id, date_obj = _parse_booking(body)
+        except InvalidBooking as err:
+            return jsonify({"error": str(err)}), err.status
+        try:
+            booking = data.add_booking(
+                user_id=user_id,
+                tour_id=tour_id,
+                date=date_obj
+            )
+        except data.FullyBooked as err:
+            return jsonify({"error": str(err)}), 409
         return jsonify(booking), 201
 
+    @app.post("/bookings/batch")
+    def create_bookings_batch() -> Any:
+        body, status = _create_batch(_parse_batch(request.mimetype, request.get_data()))
+        return jsonify(body), status
+
     @app.get("/bookings")
     def get_bookings_for_user() -> Any:
         user_id = request.args.get("userId", type=int)
         if not user_id:
             return jsonify({"error": "Missing userId"}), 400
+        limit, cursor = _paging_args(request, int)
+        if _wants_listing(request, limit, cursor):
+            return _listing(data.iter_bookings_by_user(user_id, after=cursor or 0), limit)
         bookings = data.get_bookings_by_user(user_id)
         return jsonify(bookings)
 
@@ -97,7 +336,7 @@ def create_app() -> Flask:
         user = data.get_user(user_id)
         if not user:
             abort(404, description="User not found")
-        return jsonify(user)
+        return cache.respond(("user", user_id), "user", lambda: user)
 
     # ----------------------
     # Recommendations (stub)
@@ -107,8 +346,20 @@ def create_app() -> Flask:
         city = request.args.get("city", type=str)
         if not city:
             return jsonify({"error": "Missing required query parameter 'city'"}), 400
-        recs = data.get_recommendations(city)
-        return jsonify({"city": city, "recommendations": recs})
+        city_key = data.normalize_city(city)
+        user_id = request.args.get("userId", type=int)
+        if user_id is not None:
+            # Personalized scores depend on the user's own bookings; not cached
+            if not data.get_user(user_id):
+                abort(404, description="User not found")
+            recs = data.get_recommendations(city_key, user_id=user_id)
+            return jsonify({"city": city_key, "userId": user_id, "recommendations": recs})
+        # One entry per known city: the body echoes the normalized city, so spellings
+        # and whitespace variants share it, and unknown cities aren't cached at all
+        if city_key not in data.TOURS_BY_CITY:
+            return jsonify({"city": city_key, "recommendations": []})
+        return cache.respond(("recommendations", city_key), "recommendations",
+                             lambda: {"city": city_key, "recommendations": data.get_recommendations(city_key)})
 
     # -----------------
     # Payments (stub)
@@ -0,0 +1,191 @@
+# Async (ASGI) variant of the City Tours monolith built on Quart, Flask's asyncio twin.
+# Same routes, same seed_data functions and the same config as app.py; requests are
+# served from one event loop instead of one worker thread each, so slow downstream calls
+# (payments, recommendations once they leave the monolith) don't cap concurrency.
+#
+#   uvicorn --factory asgi_app:create_async_app --host 0.0.0.0 --port 5000
+
+from __future__ import annotations
+from quart import Quart, Response, jsonify, request, abort
+from typing import Any, Callable, Dict, TypeVar
+import asyncio
+import datetime as dt
+import seed_data as data
+from app import (
+    BadRequest, InvalidBooking, _availability_body, _availability_range, _configure,
+    _create_batch, _ndjson_lines, _page_body, _paging_args, _parse_batch, _parse_booking,
+    _wants_listing, _wants_ndjson,
+)
+
+T = TypeVar("T")
+
+
+def create_async_app(config: Dict[str, Any] | None = None) -> Quart:
+    app = Quart(__name__)
+    cache = _configure(app, config)
+    # The memory store is a few dict operations, cheaper to run inline than to hand off.
+    # A SQLite store does disk I/O, so its calls go to a worker thread.
+    inline = app.config["STORAGE_BACKEND"] == "memory"
+
+    async def run(fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        if inline:
+            return fn(*args, **kwargs)
+        return await asyncio.to_thread(fn, *args, **kwargs)
+
+    def cached(group: Any, variant: Any, build: Callable[[], Any]) -> Response:
+        return cache.respond(group, variant, build, req=request, response_class=Response)
+
+    async def listing(pairs: Any, limit: int | None) -> Any:
+        if _wants_ndjson(request):
+            return Response(_ndjson_lines(pairs, limit), mimetype="application/x-ndjson")
+        return jsonify(await run(_page_body, pairs, limit))
+
+    @app.errorhandler(BadRequest)
+    async def bad_request(err: BadRequest) -> Any:
+        return jsonify({"error": str(err)}), 400
+
+    # -----------------
+    # Health & metadata
+    # -----------------
+    @app.get("/health")
+    async def health() -> Any:
+        return jsonify({
+            "status": "ok",
+            "service": "city-tours-monolith",
+            "version": "1.0.0",
+            "mode": "asgi",
+            "time": dt.datetime.utcnow().isoformat() + "Z"
+        })
+
+    @app.get("/")
+    async def root() -> Any:
+        return jsonify({
+            "message": "City Tours Monolith (async)",
+            "endpoints": [
+                "/catalog/tours?city=paris",
+                "/catalog/tours?city=paris&limit=20&cursor=...",
+                "/catalog/tours/paris-food-101/availability?from=2025-08-01&to=2025-08-31",
+                "/bookings (POST)",
+                "/bookings/batch (POST)",
+                "/bookings?userId=42",
+                "/users/42",
+                "/recommendations?city=paris",
+                "/recommendations?city=paris&userId=42",
+                "/payments/checkout (POST)"
+            ]
+        })
+
+    # --------------
+    # Catalog (slice)
+    # --------------
+    @app.get("/catalog/tours")
+    async def list_tours() -> Any:
+        city = request.args.get("city", type=str)
+        if not city:
+            return jsonify({"error": "Missing required query parameter 'city'"}), 400
+        city_key = data.normalize_city(city)
+        limit, cursor = _paging_args(request, str)
+        if _wants_listing(request, limit, cursor):
+            return await listing(data.iter_tours_by_city(city_key, after=cursor), limit)
+        if city_key not in data.TOURS_BY_CITY:
+            return jsonify([])
+        return cached(("city", city_key), "tours", lambda: data.query_tours_by_city(city_key))
+
+    @app.get("/catalog/tours/<tour_id>")
+    async def get_tour(tour_id: str) -> Any:
+        tour = data.get_tour(tour_id)
+        if not tour:
+            abort(404, description="Tour not found")
+        return cached(("tour", tour_id), "tour", lambda: tour)
+
+    @app.get("/catalog/tours/<tour_id>/availability")
+    async def get_tour_availability(tour_id: str) -> Any:
+        tour = data.get_tour(tour_id)
+        if not tour:
+            abort(404, description="Tour not found")
+        start, end = _availability_range(request.args)
+        return jsonify(await run(_availability_body, tour, start, end))
+
+    # ----------------
+    # Bookings (slice)
+    # ----------------
+    @app.post("/bookings")
+    async def create_booking() -> Any:
+        body = await request.get_json(silent=True) or {}
+        try:
+            user_id, tour_id, date_obj = _parse_booking(body)
+        except InvalidBooking as err:
+            return jsonify({"error": str(err)}), err.status
+        try:
+            booking = await run(data.add_booking, user_id=user_id, tour_id=tour_id, date=date_obj)
+        except data.FullyBooked as err:
+            return jsonify({"error": str(err)}), 409
+        return jsonify(booking), 201
+
+    @app.post("/bookings/batch")
+    async def create_bookings_batch() -> Any:
+        items = _parse_batch(request.mimetype, await request.get_data())
+        body, status = await run(_create_batch, items)
+        return jsonify(body), status
+
+    @app.get("/bookings")
+    async def get_bookings_for_user() -> Any:
+        user_id = request.args.get("userId", type=int)
+        if not user_id:
+            return jsonify({"error": "Missing userId"}), 400
+        limit, cursor = _paging_args(request, int)
+        if _wants_listing(request, limit, cursor):
+            return await listing(data.iter_bookings_by_user(user_id, after=cursor or 0), limit)
+        return jsonify(await run(data.get_bookings_by_user, user_id))
+
+    # -------------
+    # Users (slice)
+    # -------------
+    @app.get("/users/<int:user_id>")
+    async def get_user(user_id: int) -> Any:
+        user = data.get_user(user_id)
+        if not user:
+            abort(404, description="User not found")
+        return cached(("user", user_id), "user", lambda: user)
+
+    # ---------------
+    # Recommendations
+    # ---------------
+    @app.get("/recommendations")
+    async def recommendations() -> Any:
+        city = request.args.get("city", type=str)
+        if not city:
+            return jsonify({"error": "Missing required query parameter 'city'"}), 400
+        city_key = data.normalize_city(city)
+        user_id = request.args.get("userId", type=int)
+        if user_id is not None:
+            if not data.get_user(user_id):
+                abort(404, description="User not found")
+            recs = data.get_recommendations(city_key, user_id=user_id)
+            return jsonify({"city": city_key, "userId": user_id, "recommendations": recs})
+        if city_key not in data.TOURS_BY_CITY:
+            return jsonify({"city": city_key, "recommendations": []})
+        return cached(("recommendations", city_key), "recommendations",
+                      lambda: {"city": city_key, "recommendations": data.get_recommendations(city_key)})
+
+    # -----------------
+    # Payments (stub)
+    # -----------------
+    @app.post("/payments/checkout")
+    async def checkout() -> Any:
+        body = await request.get_json(silent=True) or {}
+        if not {"bookingId", "amount"}.issubset(body):
+            return jsonify({"error": "Expected bookingId and amount"}), 400
+        return jsonify({
+            "status": "authorized",
+            "bookingId": body["bookingId"],
+            "amount": body["amount"],
+            "provider": "demo-gateway"
+        }), 200
+
+    return app
+
+
+if __name__ == "__main__":
+    import uvicorn
+    uvicorn.run(create_async_app(), host="0.0.0.0", port=5000)
@@ -0,0 +1,65 @@
+# Seats taken per (tour, date) for the memory booking store. Partitioned by tour, then by
+# ISO date, so "how full is tour X between D1 and D2" reads a handful of dict entries
+# instead of scanning bookings.
+
+from __future__ import annotations
+from typing import Dict, List, Any, Set
+import datetime as dt
+import threading
+
+
+class FullyBooked(ValueError):
+    pass
+
+
+class AvailabilityIndex:
+    """Each (tour, date) partition holds the ids of users with a seat, so re-posting the
+    same booking doesn't take a second seat. Reservations check capacity and claim the
+    seat under a lock striped by tour, making the check-and-increment atomic."""
+
+    def __init__(self, stripes: int = 64) -> None:
+        self.partitions: Dict[str, Dict[str, Set[int]]] = {}
+        self._stripes = [threading.Lock() for _ in range(max(1, int(stripes)))]
+
+    def _lock_for(self, tour_id: str) -> threading.Lock:
+        return self._stripes[hash(tour_id) % len(self._stripes)]
+
+    def reserve(self, tour_id: str, date: str, user_id: int, capacity: int | None) -> bool:
+        """Claim a seat or raise FullyBooked; False when the user already holds one.
+        `capacity` None means unlimited."""
+        with self._lock_for(tour_id):
+            seats = self.partitions.setdefault(tour_id, {}).setdefault(date, set())
+            if user_id in seats:
+                return False
+            if capacity is not None and len(seats) >= capacity:
+                raise FullyBooked(f"Tour {tour_id} is fully booked on {date}")
+            seats.add(user_id)
+            return True
+
+    def booked(self, tour_id: str, start: dt.date, end: dt.date) -> Dict[str, int]:
+        """Seats taken per ISO date in [start, end]; dates without bookings are omitted."""
+        by_date = self.partitions.get(tour_id, {})
+        counts = {}
+        day = start
+        while day <= end:
+            seats = by_date.get(day.isoformat())
+            if seats:
+                counts[day.isoformat()] = len(seats)
+            day += dt.timedelta(days=1)
+        return counts
+
+
+def days(booked: Dict[str, int], start: dt.date, end: dt.date,
+         capacity: int | None) -> List[Dict[str, Any]]:
+    """One entry per day in [start, end] from a store's booked() counts."""
+    result = []
+    day = start
+    while day <= end:
+        taken = booked.get(day.isoformat(), 0)
+        result.append({
+            "date": day.isoformat(),
+            "booked": taken,
+            "available": None if capacity is None else max(0, capacity - taken),
+        })
+        day += dt.timedelta(days=1)
+    return result
@@ -0,0 +1,109 @@
+# Load test: sync Flask app under gunicorn (gthread) vs the async app under uvicorn, at a
+# fixed number of concurrent keep-alive connections. Reports requests/sec and latency
+# percentiles per server.
+#
+#   python bench_async.py --connections 1000 --duration 15 --path "/recommendations?city=paris"
+
+from __future__ import annotations
+import argparse
+import asyncio
+import os
+import resource
+import socket
+import subprocess
+import sys
+import time
+
+import aiohttp
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def server_cmd(kind: str, port: int, workers: int, threads: int) -> list:
+    if kind == "sync":
+        return [sys.executable, "-m", "gunicorn", "-w", str(workers), "--threads", str(threads),
+                "-k", "gthread", "-b", f"127.0.0.1:{port}", "--log-level", "warning",
+                "app:create_app()"]
+    return [sys.executable, "-m", "uvicorn", "--factory", "asgi_app:create_async_app",
+            "--workers", str(workers), "--host", "127.0.0.1", "--port", str(port),
+            "--log-level", "warning", "--no-access-log"]
+
+
+def wait_for_port(port: int, timeout: float = 20.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        with socket.socket() as s:
+            if s.connect_ex(("127.0.0.1", port)) == 0:
+                return
+        time.sleep(0.1)
+    raise RuntimeError(f"server on port {port} did not start")
+
+
+def percentile(sorted_values: list, pct: float) -> float:
+    if not sorted_values:
+        return float("nan")
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * pct / 100))]
+
+
+async def drive(url: str, connections: int, duration: float) -> tuple:
+    latencies: list = []
+    errors = 0
+    connector = aiohttp.TCPConnector(limit=connections, force_close=False)
+    timeout = aiohttp.ClientTimeout(total=30)
+    async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+        stop = time.monotonic() + duration
+
+        async def client() -> None:
+            nonlocal errors
+            while time.monotonic() < stop:
+                t0 = time.perf_counter()
+                try:
+                    async with session.get(url) as resp:
+                        await resp.read()
+                        if resp.status >= 500:
+                            errors += 1
+                            continue
+                except (aiohttp.ClientError, asyncio.TimeoutError):
+                    errors += 1
+                    continue
+                latencies.append(time.perf_counter() - t0)
+
+        t0 = time.monotonic()
+        await asyncio.gather(*(client() for _ in range(connections)))
+        elapsed = time.monotonic() - t0
+    return latencies, errors, elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compare sync (gunicorn) and async (uvicorn) city-tours apps")
+    parser.add_argument("--connections", type=int, default=1000)
+    parser.add_argument("--duration", type=float, default=15.0)
+    parser.add_argument("--path", default="/recommendations?city=paris")
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--threads", type=int, default=32, help="gthread threads per sync worker")
+    parser.add_argument("--servers", nargs="+", choices=["sync", "async"], default=["sync", "async"])
+    args = parser.parse_args()
+
+    # 1k sockets on the client plus the server's side need more than the usual 1024 fds
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    resource.setrlimit(resource.RLIMIT_NOFILE, (max(soft, min(hard, args.connections * 4)), hard))
+
+    print(f"{'server':<8}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}{'errors':>8}")
+    for i, kind in enumerate(args.servers):
+        port = 5100 + i
+        proc = subprocess.Popen(server_cmd(kind, port, args.workers, args.threads), cwd=HERE)
+        try:
+            wait_for_port(port)
+            latencies, errors, elapsed = asyncio.run(
+                drive(f"http://127.0.0.1:{port}{args.path}", args.connections, args.duration))
+        finally:
+            proc.terminate()
+            proc.wait()
+        latencies.sort()
+        print(f"{kind:<8}{len(latencies) / elapsed:>10,.0f}"
+              f"{percentile(latencies, 50) * 1000:>10.1f}{percentile(latencies, 99) * 1000:>10.1f}"
+              f"{errors:>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+# Bookings/sec for POST /bookings (one per request) vs POST /bookings/batch, measured
+# through the Flask test client so only app-side costs (dispatch, JSON, validation,
+# storage) are compared.
+#
+#   python bench_batch.py --bookings 20000 --batch-size 500 --backend sqlite
+
+from __future__ import annotations
+import argparse
+import datetime as dt
+import os
+import tempfile
+import time
+
+import app as city_tours
+import seed_data as data
+
+
+def bodies(n: int, offset: int):
+    tour_ids = list(data.TOURS)
+    user_ids = list(data.USERS)
+    start_date = dt.date(2025, 1, 1)
+    for i in range(offset, offset + n):
+        yield {
+            "tourId": tour_ids[i % len(tour_ids)],
+            "userId": user_ids[i % len(user_ids)],
+            "date": (start_date + dt.timedelta(days=i)).isoformat(),
+        }
+
+
+def single(client, n: int) -> float:
+    t0 = time.perf_counter()
+    for body in bodies(n, 0):
+        assert client.post("/bookings", json=body).status_code == 201
+    return n / (time.perf_counter() - t0)
+
+
+def batched(client, n: int, batch_size: int) -> float:
+    t0 = time.perf_counter()
+    for offset in range(0, n, batch_size):
+        chunk = list(bodies(min(batch_size, n - offset), n + offset))
+        resp = client.post("/bookings/batch", json=chunk)
+        assert resp.json["created"] == len(chunk), resp.json
+    return n / (time.perf_counter() - t0)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark single vs batched booking creation")
+    parser.add_argument("--bookings", type=int, default=5000)
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--backend", choices=["memory", "sqlite"], default="memory")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        client = city_tours.create_app({
+            "STORAGE_BACKEND": args.backend,
+            "SQLITE_PATH": os.path.join(tmp, "bench.db"),
+        }).test_client()
+        one = single(client, args.bookings)
+        many = batched(client, args.bookings, args.batch_size)
+        data.STORE.close()
+
+    print(f"{'mode':<28}{'bookings/sec':>14}")
+    print(f"{'POST /bookings':<28}{one:>14,.0f}")
+    print(f"{f'POST /bookings/batch ({args.batch_size})':<28}{many:>14,.0f}")
+    print(f"speedup: {many / one:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
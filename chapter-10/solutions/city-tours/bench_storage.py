@@ -0,0 +1,61 @@
+# Bookings/sec per storage backend. Writes go through seed_data.add_booking (the same
+# path the POST /bookings handler uses) from --threads concurrent writers, like request
+# threads. add_booking returns once the booking is committed; SQLite's group commit
+# batches whatever the other writers queued meanwhile, up to --batch-size.
+#
+#   python bench_storage.py --bookings 50000 --threads 16 --batch-size 1 64 512
+
+from __future__ import annotations
+import argparse
+import datetime as dt
+from concurrent.futures import ThreadPoolExecutor
+import os
+import tempfile
+import time
+
+import seed_data as data
+import storage
+
+
+def run(store: storage.BookingStore, n: int, threads: int) -> float:
+    previous = data.use_store(store)
+    tour_ids = list(data.TOURS)
+    user_ids = list(data.USERS)
+    start_date = dt.date(2025, 1, 1)
+
+    def book(i: int) -> None:
+        data.add_booking(
+            user_id=user_ids[i % len(user_ids)],
+            tour_id=tour_ids[i % len(tour_ids)],
+            date=start_date + dt.timedelta(days=i),
+        )
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(threads) as pool:
+        for _ in pool.map(book, range(n)):
+            pass
+    elapsed = time.perf_counter() - t0
+    assert store.count() == n, f"expected {n} bookings, store has {store.count()}"
+    store.close()
+    data.use_store(previous)
+    return n / elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark city-tours booking storage backends")
+    parser.add_argument("--bookings", type=int, default=20000)
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--batch-size", type=int, nargs="+", default=[1, 64, 512])
+    args = parser.parse_args()
+
+    print(f"{'backend':<24}{'bookings/sec':>14}")
+    print(f"{'memory':<24}{run(storage.MemoryBookingStore(), args.bookings, args.threads):>14,.0f}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for batch in args.batch_size:
+            path = os.path.join(tmp, f"bench-{batch}.db")
+            store = storage.SQLiteBookingStore(path, batch_size=batch)
+            print(f"{f'sqlite (batch={batch})':<24}{run(store, args.bookings, args.threads):>14,.0f}")
+
+
+if __name__ == "__main__":
+    main()
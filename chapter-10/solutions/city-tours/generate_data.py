@@ -0,0 +1,114 @@
+# Deterministic synthetic data for load testing: N users, M tours across K cities and B
+# bookings, loaded into seed_data through its bulk helpers. The same seed always yields
+# the same catalog and bookings.
+#
+#   python generate_data.py --users 50000 --tours 200000 --cities 50 --bookings 1000000
+#
+# Run standalone it only times generation. To serve the data, start the app with
+# CITYTOURS_SYNTHETIC_DATA=users:tours:cities:bookings; every worker builds the same set.
+
+from __future__ import annotations
+from typing import Dict, List, Any, Iterator
+import argparse
+import datetime as dt
+import itertools
+import random
+import time
+
+import seed_data as data
+
+TAGS = ["food", "walking", "local", "boat", "night", "photography", "history", "art",
+        "family", "museum", "bike", "wine", "architecture", "nature", "shopping"]
+FIRST_NAMES = ["Alex", "Samira", "Jonas", "Mei", "Lucas", "Amara", "Noah", "Ines", "Ravi", "Elena"]
+LAST_NAMES = ["Martin", "Khan", "Schmidt", "Chen", "Silva", "Okafor", "Rossi", "Dubois", "Patel", "Novak"]
+START_DATE = dt.date(2025, 1, 1)
+DAYS = 365
+
+# Ids are offset so generated records never collide with the hand-written seed data
+USER_ID_BASE = 100000
+
+
+def city_names(k: int) -> List[str]:
+    return [f"city-{i:03d}" for i in range(k)]
+
+
+def gen_users(rng: random.Random, n: int, cities: List[str]) -> Iterator[Dict[str, Any]]:
+    for i in range(n):
+        uid = USER_ID_BASE + i
+        yield {
+            "id": uid,
+            "name": f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}",
+            "homeCity": rng.choice(cities),
+        }
+
+
+def gen_tours(rng: random.Random, m: int, cities: List[str]) -> Iterator[Dict[str, Any]]:
+    for i in range(m):
+        city = cities[i % len(cities)]
+        yield {
+            "id": f"{city}-tour-{i:07d}",
+            "city": city,
+            "title": f"{rng.choice(TAGS).title()} Tour #{i}",
+            "durationHours": rng.randint(1, 8),
+            "price": round(rng.uniform(15, 250), 2),
+            "capacity": rng.choice([10, 20, 40, 80]),
+            "tags": rng.sample(TAGS, rng.randint(1, 4)),
+        }
+
+
+def generate(users: int, tours: int, cities: int, bookings: int, seed: int = 42,
+             chunk: int = 10000) -> Dict[str, Any]:
+    """Load synthetic data into seed_data; returns counts and timings."""
+    if bookings and not users:
+        raise ValueError("bookings need at least one user")
+    rng = random.Random(seed)
+    names = city_names(cities)
+    t0 = time.perf_counter()
+    data.add_users(gen_users(rng, users, names))
+    data.add_tours(gen_tours(rng, tours, names))
+    t1 = time.perf_counter()
+
+    tour_ids = [tid for city in names for tid in data.TOURS_BY_CITY.get(city, ())]
+    # Skewed popularity: a few tours get most bookings, like a real catalog
+    cum_weights = list(itertools.accumulate(1.0 / (rank + 1) for rank in range(len(tour_ids))))
+    created = 0
+    for offset in range(0, bookings if tour_ids else 0, chunk):
+        n = min(chunk, bookings - offset)
+        picks = rng.choices(tour_ids, cum_weights=cum_weights, k=n)
+        items = [
+            (USER_ID_BASE + rng.randrange(users), tid, START_DATE + dt.timedelta(days=rng.randrange(DAYS)))
+            for tid in picks
+        ]
+        created += sum(doc is not None for doc in data.add_bookings(items))
+    t2 = time.perf_counter()
+    return {
+        "users": users, "tours": tours, "cities": cities,
+        "bookingsRequested": bookings, "bookingsCreated": created,
+        "catalogSeconds": round(t1 - t0, 2), "bookingsSeconds": round(t2 - t1, 2),
+    }
+
+
+def generate_from_spec(spec: str, seed: int = 42) -> Dict[str, Any]:
+    """Load data described as "users:tours:cities:bookings", e.g. "10000:20000:20:100000"."""
+    try:
+        users, tours, cities, bookings = (int(part) for part in str(spec).split(":"))
+    except ValueError:
+        raise ValueError(f"Expected users:tours:cities:bookings, got {spec!r}")
+    return generate(users, tours, max(1, cities), bookings, seed)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Generate a synthetic city-tours dataset")
+    parser.add_argument("--users", type=int, default=10000)
+    parser.add_argument("--tours", type=int, default=20000)
+    parser.add_argument("--cities", type=int, default=20)
+    parser.add_argument("--bookings", type=int, default=100000)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    if args.bookings and not args.users:
+        parser.error("--bookings needs at least one user")
+    print(generate(args.users, args.tours, args.cities, args.bookings, args.seed))
+
+
+if __name__ == "__main__":
+    main()
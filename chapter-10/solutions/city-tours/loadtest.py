@@ -0,0 +1,209 @@
+# Load-test harness for the city-tours app on a synthetic dataset (see generate_data.py).
+# Each endpoint is driven in turn, either in-process through the Flask test client or over
+# real HTTP. The harness reports throughput, latency percentiles and peak RSS per endpoint.
+#
+#   python loadtest.py --mode client --requests 2000
+#   python loadtest.py --mode http --requests 20000 --concurrency 32
+#   CITYTOURS_SYNTHETIC_DATA=10000:20000:20:100000 gunicorn -w 2 -b :5000 "app:create_app()"
+#   python loadtest.py --mode http --url http://localhost:5000
+#
+# With --url the server runs elsewhere: start it with CITYTOURS_SYNTHETIC_DATA set to
+# users:tours:cities:bookings matching this script's options, so the ids it requests exist.
+# RSS isn't reported then. In-process HTTP mode reports the RSS of this process, which
+# holds the server and the client threads.
+
+from __future__ import annotations
+from typing import Any, Callable, Dict, List, Tuple
+import argparse
+import datetime as dt
+import http.client
+import json
+import logging
+import os
+import random
+import resource
+import threading
+import time
+import urllib.parse
+
+from werkzeug.serving import WSGIRequestHandler, make_server
+
+import app as city_tours
+import generate_data
+import seed_data as data
+
+Request = Tuple[str, str, Dict[str, Any] | None]  # (method, path, json body)
+
+
+def endpoints(rng: random.Random, cities: List[str], user_ids: List[int],
+              tour_ids: List[str]) -> Dict[str, Callable[[], Request]]:
+    def booking() -> Request:
+        date = generate_data.START_DATE + dt.timedelta(days=rng.randrange(generate_data.DAYS))
+        return "POST", "/bookings", {"tourId": rng.choice(tour_ids), "userId": rng.choice(user_ids),
+                                     "date": date.isoformat()}
+    return {
+        "GET /catalog/tours": lambda: ("GET", f"/catalog/tours?city={rng.choice(cities)}", None),
+        "GET /catalog/tours (page)": lambda: ("GET", f"/catalog/tours?city={rng.choice(cities)}&limit=50", None),
+        "GET /catalog/tours/<id>": lambda: ("GET", f"/catalog/tours/{rng.choice(tour_ids)}", None),
+        "GET /bookings": lambda: ("GET", f"/bookings?userId={rng.choice(user_ids)}", None),
+        "GET /recommendations": lambda: ("GET", f"/recommendations?city={rng.choice(cities)}", None),
+        "GET /recommendations (user)": lambda: (
+            "GET", f"/recommendations?city={rng.choice(cities)}&userId={rng.choice(user_ids)}", None),
+        "POST /bookings": booking,
+    }
+
+
+def current_rss() -> int:
+    """Resident set size in bytes (Linux /proc; peak RSS elsewhere)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+class RssSampler:
+    def __init__(self, interval: float = 0.01) -> None:
+        self.interval = interval
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self.peak = max(self.peak, current_rss())
+            self._stop.wait(self.interval)
+
+    def __enter__(self) -> "RssSampler":
+        self.peak = current_rss()
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, current_rss())
+
+
+def run_client(flask_app: Any, make: Callable[[], Request], n: int) -> Tuple[List[float], int]:
+    client = flask_app.test_client()
+    latencies, errors = [], 0
+    for _ in range(n):
+        method, path, body = make()
+        t0 = time.perf_counter()
+        resp = client.open(path, method=method, json=body)
+        resp.get_data()
+        latencies.append(time.perf_counter() - t0)
+        errors += resp.status_code >= 500
+    return latencies, errors
+
+
+def run_http(base: str, make: Callable[[], Request], n: int, concurrency: int) -> Tuple[List[float], int]:
+    parsed = urllib.parse.urlsplit(base)
+    latencies: List[float] = []
+    errors = 0
+    lock = threading.Lock()
+    remaining = [n]
+
+    def worker() -> None:
+        nonlocal errors
+        conn = http.client.HTTPConnection(parsed.hostname, parsed.port or 80, timeout=30)
+        local, local_errors = [], 0
+        while True:
+            with lock:
+                if remaining[0] <= 0:
+                    break
+                remaining[0] -= 1
+                method, path, body = make()
+            payload = json.dumps(body).encode() if body is not None else None
+            headers = {"Content-Type": "application/json"} if body is not None else {}
+            t0 = time.perf_counter()
+            try:
+                conn.request(method, path, body=payload, headers=headers)
+                resp = conn.getresponse()
+                resp.read()
+                local_errors += resp.status >= 500
+            except (OSError, http.client.HTTPException):
+                local_errors += 1
+                conn.close()
+                conn = http.client.HTTPConnection(parsed.hostname, parsed.port or 80, timeout=30)
+                continue
+            local.append(time.perf_counter() - t0)
+        conn.close()
+        with lock:
+            latencies.extend(local)
+            errors += local_errors
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return latencies, errors
+
+
+def pct(sorted_values: List[float], p: float) -> float:
+    if not sorted_values:
+        return float("nan")
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * p / 100))] * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Load-test city-tours endpoints on synthetic data")
+    parser.add_argument("--mode", choices=["client", "http"], default="client")
+    parser.add_argument("--url", help="target an already running server (http mode)")
+    parser.add_argument("--requests", type=int, default=2000, help="requests per endpoint")
+    parser.add_argument("--concurrency", type=int, default=16, help="client threads (http mode)")
+    parser.add_argument("--users", type=int, default=10000)
+    parser.add_argument("--tours", type=int, default=20000)
+    parser.add_argument("--cities", type=int, default=20)
+    parser.add_argument("--bookings", type=int, default=100000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--only", nargs="+", help="endpoint names to run (default: all)")
+    args = parser.parse_args()
+
+    flask_app = None
+    if not args.url:
+        flask_app = city_tours.create_app()
+    cities = generate_data.city_names(args.cities)
+    user_ids = [generate_data.USER_ID_BASE + i for i in range(args.users)]
+    tour_ids = [f"{cities[i % len(cities)]}-tour-{i:07d}" for i in range(args.tours)]
+    if not args.url:
+        print("dataset:", generate_data.generate(args.users, args.tours, args.cities,
+                                                 args.bookings, args.seed))
+    print(f"baseline RSS: {current_rss() / 2**20:.0f} MiB")
+
+    base, server = args.url, None
+    if args.mode == "http" and not base:
+        logging.getLogger("werkzeug").setLevel(logging.ERROR)
+        WSGIRequestHandler.protocol_version = "HTTP/1.1"  # keep-alive for client threads
+        server = make_server("127.0.0.1", 0, flask_app, threaded=True)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        base = f"http://127.0.0.1:{server.server_port}"
+
+    rng = random.Random(args.seed)
+    specs = endpoints(rng, cities, user_ids, tour_ids)
+    names = args.only or list(specs)
+    print(f"{'endpoint':<28}{'req/s':>10}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}"
+          f"{'peak RSS MiB':>14}{'errors':>8}")
+    for name in names:
+        make = specs[name]
+        with RssSampler() as rss:
+            t0 = time.perf_counter()
+            if args.mode == "client":
+                latencies, errors = run_client(flask_app, make, args.requests)
+            else:
+                latencies, errors = run_http(base, make, args.requests, args.concurrency)
+            elapsed = time.perf_counter() - t0
+        latencies.sort()
+        rss_col = "-" if args.url else f"{rss.peak / 2**20:.0f}"
+        print(f"{name:<28}{len(latencies) / elapsed:>10,.0f}{pct(latencies, 50):>9.2f}"
+              f"{pct(latencies, 95):>9.2f}{pct(latencies, 99):>9.2f}{rss_col:>14}{errors:>8}")
+
+    if server:
+        server.shutdown()
+    data.STORE.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+# Recommendation engine. Each city keeps a precomputed top-K ranking by booking popularity
+# that is updated incrementally as bookings arrive, so a request is a lookup, not a sort.
+# Personalized requests score the top-K plus every tour in the city sharing a tag with the
+# user's past bookings (found through a per-city tag index), minus the tours they already
+# booked.
+
+from __future__ import annotations
+from typing import Dict, List, Any, Iterable, Set, Tuple
+from collections import Counter
+import heapq
+import threading
+
+
+class RecommendationEngine:
+    # Score = W_POPULAR * popularity (relative to the city's most booked tour)
+    #       + W_TAGS * share of the user's booked tags this tour carries
+    W_POPULAR = 1.0
+    W_TAGS = 2.0
+
+    def __init__(self, tours: Dict[str, Dict[str, Any]], top_k: int = 10) -> None:
+        self.tours = tours
+        self.top_k = top_k
+        self._lock = threading.Lock()
+        self.popularity: Counter = Counter()
+        self.user_tags: Dict[int, Counter] = {}
+        self.user_tours: Dict[int, Set[str]] = {}
+        self.rankings: Dict[str, List[str]] = {}
+        # city -> all its tour ids, and city -> tag -> tour ids carrying it
+        self.city_tours: Dict[str, List[str]] = {}
+        self.tag_index: Dict[str, Dict[str, Set[str]]] = {}
+
+    def _rank_key(self, tour_id: str) -> Tuple[int, str, str]:
+        # Most booked first; title then id keep ties deterministic
+        return -self.popularity[tour_id], self.tours[tour_id]["title"], tour_id
+
+    def rebuild_city(self, city: str, tour_ids: Iterable[str]) -> None:
+        """Recompute a city's ranking and tag index from scratch (catalog changes only)."""
+        tour_ids = list(tour_ids)
+        tags: Dict[str, Set[str]] = {}
+        for tid in tour_ids:
+            for tag in self.tours[tid]["tags"]:
+                tags.setdefault(tag, set()).add(tid)
+        with self._lock:
+            self.rankings[city] = heapq.nsmallest(self.top_k, tour_ids, key=self._rank_key)
+            self.city_tours[city] = tour_ids
+            self.tag_index[city] = tags
+
+    def reset(self, bookings: Iterable[Dict[str, Any]], cities: Dict[str, List[str]]) -> None:
+        """Rebuild all state, e.g. after switching to a store that already holds bookings."""
+        with self._lock:
+            self.popularity.clear()
+            self.user_tags.clear()
+            self.user_tours.clear()
+            for doc in bookings:
+                if doc["tourId"] in self.tours:
+                    self._count(doc)
+        for city, tour_ids in cities.items():
+            self.rebuild_city(city, tour_ids)
+
+    def _count(self, doc: Dict[str, Any]) -> None:
+        self.popularity[doc["tourId"]] += 1
+        self.user_tags.setdefault(doc["userId"], Counter()).update(self.tours[doc["tourId"]]["tags"])
+        self.user_tours.setdefault(doc["userId"], set()).add(doc["tourId"])
+
+    def record_booking(self, doc: Dict[str, Any], city: str) -> bool:
+        """Count a new booking (callers skip re-posted ones); returns True when the city's
+        ranking order changed.
+
+        Popularity only grows, so the booked tour is the only one that can move: it either
+        climbs within the top-K or displaces the last entry."""
+        tour_id = doc["tourId"]
+        with self._lock:
+            self._count(doc)
+            ranking = self.rankings.setdefault(city, [])
+            before = list(ranking)
+            if tour_id not in ranking:
+                if len(ranking) >= self.top_k and self._rank_key(tour_id) > self._rank_key(ranking[-1]):
+                    return False
+                ranking.append(tour_id)
+            ranking.sort(key=self._rank_key)
+            del ranking[self.top_k:]
+            return ranking != before
+
+    def _candidates(self, city: str, tags: Counter, booked: Set[str], limit: int) -> List[str]:
+        """Tours that can make a user's top `limit`: the popularity top-K and any tour
+        sharing one of their tags. Anything else scores at most its popularity, which a
+        top-K tour beats, unless the user booked so many of them that fewer than `limit`
+        remain; then the whole city is scored."""
+        ranking = [tid for tid in self.rankings.get(city, ()) if tid not in booked]
+        if len(ranking) < limit:
+            return [tid for tid in self.city_tours.get(city, ()) if tid not in booked]
+        by_tag = self.tag_index.get(city, {})
+        matching = set().union(*(by_tag.get(tag, ()) for tag in tags)) - booked
+        return ranking + sorted(matching.difference(ranking))
+
+    def recommend(self, city: str, user: Dict[str, Any] | None = None,
+                  limit: int = 2) -> List[Dict[str, Any]]:
+        with self._lock:
+            ranking = self.rankings.get(city, [])
+            if user is None:
+                return [{"tourId": tid, "reason": "popular"} for tid in ranking[:limit]]
+            top = self.popularity[ranking[0]] if ranking else 0
+            user_id = int(user["id"])
+            tags = self.user_tags.get(user_id, Counter())
+            tag_total = sum(tags.values())
+            scored = []
+            for tid in self._candidates(city, tags, self.user_tours.get(user_id, set()), limit):
+                overlap = sum(tags[t] for t in self.tours[tid]["tags"]) / tag_total if tag_total else 0.0
+                score = (self.W_POPULAR * (self.popularity[tid] / top if top else 0.0)
+                         + self.W_TAGS * overlap)
+                scored.append((score, self._rank_key(tid), tid,
+                               "matches your interests" if overlap else "popular"))
+        # Popularity order (the ranking key) breaks score ties
+        scored.sort(key=lambda s: (-s[0], s[1]))
+        return [{"tourId": tid, "reason": reason, "score": round(score, 3)}
+                for score, _, tid, reason in scored[:limit]]
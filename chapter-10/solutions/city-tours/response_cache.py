@@ -0,0 +1,57 @@
+# Pre-encoded JSON responses for read-only catalog endpoints. Entries are grouped by the
+# piece of catalog data they were built from (a city, a tour, a user) so a change to that
+# data drops exactly the responses that embed it.
+
+from __future__ import annotations
+from typing import Any, Callable, Dict, Hashable, Tuple
+import hashlib
+import threading
+
+from flask import Response, request
+
+Group = Tuple[str, Hashable]          # e.g. ("city", "paris"), ("tour", "paris-food-101")
+Entry = Tuple[bytes, str]             # (encoded body, etag)
+
+
+class ResponseCache:
+    def __init__(self, encode: Callable[[Any], bytes]) -> None:
+        self._encode_payload = encode
+        self._lock = threading.Lock()
+        self._entries: Dict[Group, Dict[Hashable, Entry]] = {}
+        # Bumped on invalidation so a build racing with a change is not stored
+        self._generations: Dict[Group, int] = {}
+
+    def _encode(self, payload: Any) -> Entry:
+        body = self._encode_payload(payload)
+        return body, hashlib.blake2b(body, digest_size=12).hexdigest()
+
+    def get(self, group: Group, variant: Hashable, build: Callable[[], Any]) -> Entry:
+        with self._lock:
+            entry = self._entries.get(group, {}).get(variant)
+            generation = self._generations.get(group, 0)
+        if entry is not None:
+            return entry
+        entry = self._encode(build())
+        with self._lock:
+            if self._generations.get(group, 0) == generation:
+                self._entries.setdefault(group, {})[variant] = entry
+        return entry
+
+    def invalidate(self, kind: str, key: Hashable) -> None:
+        group = (kind, key)
+        with self._lock:
+            self._entries.pop(group, None)
+            self._generations[group] = self._generations.get(group, 0) + 1
+
+    def respond(self, group: Group, variant: Hashable, build: Callable[[], Any],
+                req: Any = request, response_class: type = Response) -> Any:
+        """Serve the cached body with its ETag; 304 when If-None-Match already matches.
+        `req`/`response_class` default to Flask's; the async app passes Quart's."""
+        body, etag = self.get(group, variant, build)
+        if req.if_none_match.contains_weak(etag):
+            resp = response_class(b"", status=304)
+            resp.set_etag(etag)
+            return resp
+        resp = response_class(body, mimetype="application/json")
+        resp.set_etag(etag)
+        return resp
@@ -1,8 +1,16 @@
 # Static data + tiny in-memory stores. For the chapter flow we keep state ephemeral.
 
 from __future__ import annotations
-from typing import Dict, List, Any
+from typing import Callable, Dict, Iterable, Iterator, List, Any, Tuple
+from itertools import islice
+import bisect
 import datetime as dt
+import types
+import weakref
+from storage import BookingStore, MemoryBookingStore
+from recommendations import RecommendationEngine
+import availability
+from availability import FullyBooked
 
 # Users (minimal)
 USERS: Dict[int, Dict[str, Any]] = {
@@ -18,6 +26,7 @@ TOURS: Dict[str, Dict[str, Any]] = {
         "title": "Paris Street Food Walk",
         "durationHours": 3,
         "price": 49.0,
+        "capacity": 20,
         "tags": ["food", "walking", "local"]
     },
     "paris-night-views": {
@@ -26,6 +35,7 @@ TOURS: Dict[str, Dict[str, Any]] = {
         "title": "Seine Night Cruise & Skyline",
         "durationHours": 2,
         "price": 59.0,
+        "capacity": 12,
         "tags": ["boat", "night", "photography"]
     },
     "rome-history-core": {
@@ -34,17 +44,110 @@ TOURS: Dict[str, Dict[str, Any]] = {
         "title": "Colosseum & Forum Essentials",
         "durationHours": 4,
         "price": 69.0,
+        "capacity": 25,
         "tags": ["history", "walking"]
     },
 }
 
-# Bookings (in-memory)
-BOOKINGS: Dict[str, Dict[str, Any]] = {}
+# Bookings live in a pluggable store; in-memory by default, swapped via use_store().
+# The store also enforces each tour's daily capacity and answers availability queries.
+STORE: BookingStore = MemoryBookingStore()
+
+# Secondary index so city lookups don't scan TOURS. Keys are normalized once on write;
+# values are kept sorted by tour id, which gives listings a stable keyset order.
+TOURS_BY_CITY: Dict[str, List[str]] = {}
+
+# Called as listener(kind, key) when catalog data changes, e.g. ("city", "paris") or
+# ("tour", "paris-food-101"). Response caches use this to drop stale entries. Listeners
+# are held weakly, so each create_app() doesn't keep every earlier app's cache alive.
+CHANGE_LISTENERS: List[weakref.ref] = []
+
+
+def on_change(listener: Callable[[str, Any], None]) -> None:
+    """Subscribe `listener` for as long as something else holds a reference to it (for
+    a bound method such as cache.invalidate, as long as its object is alive)."""
+    ref = weakref.WeakMethod(listener) if isinstance(listener, types.MethodType) else weakref.ref(listener)
+    CHANGE_LISTENERS[:] = [r for r in CHANGE_LISTENERS if r() is not None] + [ref]
+
+
+def _notify(kind: str, key: Any) -> None:
+    for ref in list(CHANGE_LISTENERS):
+        listener = ref()
+        if listener is not None:
+            listener(kind, key)
+
+
+def normalize_city(city: str) -> str:
+    return city.strip().lower()
+
+
+def _index_tour(tour: Dict[str, Any]) -> None:
+    bisect.insort(TOURS_BY_CITY.setdefault(normalize_city(tour["city"]), []), tour["id"])
+
+
+for _tour in TOURS.values():
+    _index_tour(_tour)
+
+# Per-city top-K rankings, kept current by add_tour/add_booking
+ENGINE = RecommendationEngine(TOURS)
+for _city, _ids in TOURS_BY_CITY.items():
+    ENGINE.rebuild_city(_city, _ids)
+
+
+
+def _reindex_city(city: str) -> None:
+    ENGINE.rebuild_city(city, TOURS_BY_CITY.get(city, []))
+    _notify("city", city)
+    _notify("recommendations", city)
+
+
+def add_tour(tour: Dict[str, Any]) -> Dict[str, Any]:
+    add_tours([tour])
+    return tour
+
+
+def add_tours(tours: Iterable[Dict[str, Any]]) -> int:
+    """Add or replace tours, then re-sort and re-rank each touched city once."""
+    touched = set()
+    count = 0
+    for tour in tours:
+        if tour["id"] in TOURS:
+            # Re-adding may move the tour to another city; drop its old index entry
+            old_city = normalize_city(TOURS[tour["id"]]["city"])
+            TOURS_BY_CITY[old_city].remove(tour["id"])
+            touched.add(old_city)
+        TOURS[tour["id"]] = tour
+        city = normalize_city(tour["city"])
+        TOURS_BY_CITY.setdefault(city, []).append(tour["id"])
+        touched.add(city)
+        _notify("tour", tour["id"])
+        count += 1
+    for city in touched:
+        TOURS_BY_CITY[city].sort()
+        _reindex_city(city)
+    return count
 
 
 def query_tours_by_city(city: str) -> List[Dict[str, Any]]:
-    city_norm = city.strip().lower()
-    return [t for t in TOURS.values() if t["city"].lower() == city_norm]
+    return [TOURS[tid] for tid in TOURS_BY_CITY.get(normalize_city(city), ())]
+
+
+# Paging: iterators yield (cursor, record) pairs in stable order, starting after `after`.
+# A cursor is the tour id for tours and the store's sequence number for bookings.
+
+def iter_tours_by_city(city: str, after: str | None = None) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    ids = TOURS_BY_CITY.get(normalize_city(city), [])
+    start = bisect.bisect_right(ids, after) if after is not None else 0
+    for tid in islice(ids, start, None):
+        yield tid, TOURS[tid]
+
+
+def page(pairs: Iterator[Tuple[Any, Dict[str, Any]]], limit: int) -> Tuple[List[Dict[str, Any]], Any]:
+    """Take up to `limit` records; the cursor is None when nothing follows the page."""
+    taken = list(islice(pairs, limit + 1))
+    items = [doc for _, doc in taken[:limit]]
+    next_cursor = taken[limit - 1][0] if len(taken) > limit else None
+    return items, next_cursor
 
 
 def get_tour(tour_id: str) -> Dict[str, Any] | None:
@@ -55,28 +158,87 @@ def get_user(user_id: int) -> Dict[str, Any] | None:
     return USERS.get(int(user_id))
 
 
-def add_booking(user_id: int, tour_id: str, date: dt.date) -> Dict[str, Any]:
-    booking_id = f"b-{user_id}-{tour_id}-{date.isoformat()}"
-    doc = {
-        "id": booking_id,
+def add_user(user: Dict[str, Any]) -> Dict[str, Any]:
+    USERS[int(user["id"])] = user
+    _notify("user", int(user["id"]))
+    return user
+
+
+def add_users(users: Iterable[Dict[str, Any]]) -> int:
+    count = 0
+    for user in users:
+        add_user(user)
+        count += 1
+    return count
+
+
+def _booking_doc(user_id: int, tour_id: str, date: dt.date) -> Dict[str, Any]:
+    return {
+        "id": f"b-{user_id}-{tour_id}-{date.isoformat()}",
         "userId": int(user_id),
         "tourId": tour_id,
         "date": date.isoformat(),
         "status": "created"
     }
-    BOOKINGS[booking_id] = doc
+
+
+def _record_for_recommendations(docs: Iterable[Dict[str, Any]]) -> None:
+    # Only newly stored bookings, so counts match ENGINE.reset() after a restart
+    changed = set()
+    for doc in docs:
+        city = normalize_city(TOURS[doc["tourId"]]["city"])
+        if ENGINE.record_booking(doc, city):
+            changed.add(city)
+    for city in changed:
+        _notify("recommendations", city)
+
+
+def _capacity(tour_id: str) -> int | None:
+    return TOURS[tour_id].get("capacity")
+
+
+def add_booking(user_id: int, tour_id: str, date: dt.date) -> Dict[str, Any]:
+    """Store a booking; raises FullyBooked when the tour has no seat left that day."""
+    doc = _booking_doc(user_id, tour_id, date)
+    if STORE.add(doc, _capacity(tour_id)):
+        _record_for_recommendations([doc])
     return doc
 
 
+def add_bookings(items: Iterable[Tuple[int, str, dt.date]]) -> List[Dict[str, Any] | None]:
+    """Bulk add_booking: (user_id, tour_id, date) tuples committed in one store write.
+    Returns one entry per item, None where the tour was fully booked."""
+    docs = [_booking_doc(user_id, tour_id, date) for user_id, tour_id, date in items]
+    results = STORE.add_many(docs, _capacity)
+    _record_for_recommendations(doc for doc, result in zip(docs, results) if result)
+    return [doc if result is not None else None for doc, result in zip(docs, results)]
+
+
+def get_availability(tour_id: str, start: dt.date, end: dt.date) -> List[Dict[str, Any]]:
+    return availability.days(STORE.booked(tour_id, start, end), start, end, _capacity(tour_id))
+
+
 def get_bookings_by_user(user_id: int) -> List[Dict[str, Any]]:
-    return [b for b in BOOKINGS.values() if b["userId"] == int(user_id)]
+    return STORE.by_user(user_id)
+
+
+def iter_bookings_by_user(user_id: int, after: int = 0) -> Iterator[Tuple[int, Dict[str, Any]]]:
+    return STORE.iter_by_user(user_id, after)
+
+
+def use_store(store: BookingStore) -> BookingStore:
+    """Route all booking reads/writes to `store`; returns the previous store."""
+    global STORE
+    previous, STORE = STORE, store
+    # A persistent store may already hold bookings; recount recommendations
+    ENGINE.reset(store.iter_all(), TOURS_BY_CITY)
+    for city in TOURS_BY_CITY:
+        _notify("recommendations", city)
+    return previous
 
 
-def get_recommendations(city: str) -> List[Dict[str, Any]]:
-    # Simple heuristic: return 1-2 popular items for now.
-    tours = query_tours_by_city(city)
-    if not tours:
-        return []
-    # Deterministic ordering by title for stable tests
-    tours_sorted = sorted(tours, key=lambda t: t["title"])[:2]
-    return [{"tourId": t["id"], "reason": "popular"} for t in tours_sorted]
+def get_recommendations(city: str, user_id: int | None = None, limit: int = 2) -> List[Dict[str, Any]]:
+    """Top tours for a city from the precomputed ranking; personalized when user_id is given.
+    With no bookings yet this is the first `limit` tours by title, as before."""
+    user = get_user(user_id) if user_id is not None else None
+    return ENGINE.recommend(normalize_city(city), user, limit)
@@ -0,0 +1,371 @@
+# Booking storage backends. The in-memory store is the chapter default; the SQLite store
+# persists bookings across restarts and can be shared by worker processes on one host
+# (WAL needs shared memory, so not across hosts or over a network filesystem).
+
+from __future__ import annotations
+from abc import ABC, abstractmethod
+from typing import Callable, Dict, List, Any, Iterable, Iterator, Tuple
+import atexit
+import datetime as dt
+import logging
+import sqlite3
+import threading
+from availability import AvailabilityIndex, FullyBooked
+
+log = logging.getLogger(__name__)
+
+
+class BookingStore(ABC):
+    """Interface every booking backend implements. Booking docs are plain dicts.
+
+    Capacity is enforced by the store, atomically with the write, so it holds across
+    threads and (for a shared store) across processes."""
+
+    @abstractmethod
+    def add(self, doc: Dict[str, Any], capacity: int | None = None) -> bool:
+        """Store a booking, or raise FullyBooked when its (tour, date) already holds
+        `capacity` bookings (None means unlimited). Returns False when the booking was
+        already stored: re-posting it takes no second seat."""
+
+    def add_many(self, docs: Iterable[Dict[str, Any]],
+                 capacity_of: Callable[[str], int | None] = lambda tour_id: None,
+                 ) -> List[bool | None]:
+        """add() for each doc, with capacity_of(tourId). One entry per doc: True when
+        stored, False when already stored, None when fully booked."""
+        results: List[bool | None] = []
+        for doc in docs:
+            try:
+                results.append(self.add(doc, capacity_of(doc["tourId"])))
+            except FullyBooked:
+                results.append(None)
+        return results
+
+    @abstractmethod
+    def booked(self, tour_id: str, start: dt.date, end: dt.date) -> Dict[str, int]:
+        """Bookings per ISO date in [start, end]; dates without bookings are omitted."""
+
+    @abstractmethod
+    def get(self, booking_id: str) -> Dict[str, Any] | None:
+        ...
+
+    @abstractmethod
+    def by_user(self, user_id: int) -> List[Dict[str, Any]]:
+        ...
+
+    @abstractmethod
+    def iter_by_user(self, user_id: int, after: int = 0) -> Iterator[Tuple[int, Dict[str, Any]]]:
+        """Yield (seq, doc) in booking order for seq > after. Seqs never change once issued."""
+
+    @abstractmethod
+    def iter_all(self) -> Iterator[Dict[str, Any]]:
+        ...
+
+    @abstractmethod
+    def count(self) -> int:
+        ...
+
+    def flush(self) -> None:
+        """Persist anything still buffered. No-op for unbuffered stores."""
+
+    def close(self) -> None:
+        self.flush()
+
+
+class MemoryBookingStore(BookingStore):
+    """Process-local dict plus a user -> booking-id index (the original behavior).
+
+    Writes first claim a seat in `seats` (striped by tour, so the capacity check is
+    atomic), then take one of `stripes` locks chosen by user id, so concurrent bookings
+    for different users rarely contend while the existence check and index append for
+    one user stay atomic. Reads need no lock: single dict/list operations are atomic in
+    CPython and the per-user index is append-only."""
+
+    def __init__(self, stripes: int = 64) -> None:
+        self.bookings: Dict[str, Dict[str, Any]] = {}
+        self.by_user_index: Dict[int, List[str]] = {}
+        self.seats = AvailabilityIndex(stripes)
+        self._stripes = [threading.Lock() for _ in range(max(1, int(stripes)))]
+
+    def _lock_for(self, user_id: int) -> threading.Lock:
+        return self._stripes[hash(user_id) % len(self._stripes)]
+
+    def _add_locked(self, doc: Dict[str, Any]) -> None:
+        if doc["id"] not in self.bookings:
+            self.by_user_index.setdefault(doc["userId"], []).append(doc["id"])
+        self.bookings[doc["id"]] = doc
+
+    def _reserve(self, doc: Dict[str, Any], capacity: int | None) -> bool:
+        return self.seats.reserve(doc["tourId"], doc["date"], doc["userId"], capacity)
+
+    def add(self, doc: Dict[str, Any], capacity: int | None = None) -> bool:
+        new = self._reserve(doc, capacity)
+        with self._lock_for(doc["userId"]):
+            self._add_locked(doc)
+        return new
+
+    def add_many(self, docs: Iterable[Dict[str, Any]],
+                 capacity_of: Callable[[str], int | None] = lambda tour_id: None,
+                 ) -> List[bool | None]:
+        # Claim seats first, then group the accepted docs by stripe so each lock is
+        # taken once per batch
+        results: List[bool | None] = []
+        by_stripe: Dict[int, List[Dict[str, Any]]] = {}
+        for doc in docs:
+            try:
+                results.append(self._reserve(doc, capacity_of(doc["tourId"])))
+            except FullyBooked:
+                results.append(None)
+                continue
+            by_stripe.setdefault(hash(doc["userId"]) % len(self._stripes), []).append(doc)
+        for stripe, group in by_stripe.items():
+            with self._stripes[stripe]:
+                for doc in group:
+                    self._add_locked(doc)
+        return results
+
+    def booked(self, tour_id: str, start: dt.date, end: dt.date) -> Dict[str, int]:
+        return self.seats.booked(tour_id, start, end)
+
+    def get(self, booking_id: str) -> Dict[str, Any] | None:
+        return self.bookings.get(booking_id)
+
+    def by_user(self, user_id: int) -> List[Dict[str, Any]]:
+        return [self.bookings[bid] for bid in self.by_user_index.get(int(user_id), ())]
+
+    def iter_by_user(self, user_id: int, after: int = 0) -> Iterator[Tuple[int, Dict[str, Any]]]:
+        # The per-user index is append-only, so a position (1-based) is a stable seq
+        ids = self.by_user_index.get(int(user_id), [])
+        pos = max(0, int(after))
+        while pos < len(ids):
+            pos += 1
+            yield pos, self.bookings[ids[pos - 1]]
+
+    def iter_all(self) -> Iterator[Dict[str, Any]]:
+        # Snapshot the values so concurrent writers can't resize the dict mid-iteration
+        return iter(list(self.bookings.values()))
+
+    def count(self) -> int:
+        return len(self.bookings)
+
+
+class _Write:
+    """A queued booking; `done` is set once the transaction holding it commits, and
+    `result` is add()'s return value (None when fully booked)."""
+    __slots__ = ("doc", "capacity", "result", "done")
+
+    def __init__(self, doc: Dict[str, Any], capacity: int | None) -> None:
+        self.doc = doc
+        self.capacity = capacity
+        self.result: bool | None = None
+        self.done = False
+
+
+class SQLiteBookingStore(BookingStore):
+    """SQLite in WAL mode with group commit. add() returns only once its booking is
+    committed, so an acknowledged booking survives a crash. Writers that arrive while a
+    commit is running queue up, and the next of them commits the whole queue (up to
+    `batch_size` per transaction): batches grow with concurrency instead of waiting on
+    a timer. A batch whose commit fails goes back on the queue; its writers see the
+    error, and a background flusher retries it every `flush_interval` seconds.
+
+    Each transaction starts with BEGIN IMMEDIATE, which takes SQLite's write lock, so
+    counting a (tour, date)'s bookings and inserting the new one can't interleave with
+    another writer, in this process or another one using the same file."""
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS bookings (
+        id      TEXT PRIMARY KEY,
+        user_id INTEGER NOT NULL,
+        tour_id TEXT NOT NULL,
+        date    TEXT NOT NULL,
+        status  TEXT NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS bookings_user_id ON bookings (user_id);
+    CREATE INDEX IF NOT EXISTS bookings_tour_date ON bookings (tour_id, date);
+    """
+    # Inserts nothing when the (tour, date) is full; :capacity NULL means unlimited
+    INSERT_IF_SEAT = """
+    INSERT INTO bookings (id, user_id, tour_id, date, status)
+    SELECT :id, :userId, :tourId, :date, :status
+    WHERE :capacity IS NULL
+       OR (SELECT COUNT(*) FROM bookings WHERE tour_id = :tourId AND date = :date) < :capacity
+    """
+    # A re-posted booking keeps its rowid, so per-user ordering matches the memory store
+    UPDATE_STATUS = "UPDATE bookings SET status = :status WHERE id = :id"
+    COLUMNS = "id, user_id, tour_id, date, status"
+
+    def __init__(self, path: str, batch_size: int = 64, flush_interval: float = 0.05) -> None:
+        self.batch_size = max(1, int(batch_size))
+        self.flush_interval = float(flush_interval)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA busy_timeout=5000")
+        self._conn.executescript(self.SCHEMA)
+        # _lock serializes use of the connection; _queue_lock guards _pending only, so
+        # writers can queue while a commit is running
+        self._lock = threading.Lock()
+        self._queue_lock = threading.Lock()
+        self._pending: List[_Write] = []
+        self._closed = threading.Event()
+        if self.flush_interval > 0:
+            threading.Thread(target=self._flush_loop, name="bookings-flush", daemon=True).start()
+        atexit.register(self.close)
+
+    def _flush_loop(self) -> None:
+        # Only failed batches are left queued; keep retrying them until one commits
+        while not self._closed.wait(self.flush_interval):
+            if not self._pending:
+                continue
+            try:
+                with self._lock:
+                    if not self._closed.is_set():
+                        self._flush_locked()
+            except Exception:
+                log.exception("Committing queued bookings failed; retrying in %ss",
+                              self.flush_interval)
+
+    def _flush_locked(self) -> None:
+        """Commit the oldest `batch_size` queued bookings in one transaction. On failure
+        they go back to the front of the queue and the error is raised."""
+        with self._queue_lock:
+            batch = self._pending[:self.batch_size]
+            del self._pending[:self.batch_size]
+        if not batch:
+            return
+        try:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                for write in batch:
+                    write.result = self._insert(write.doc, write.capacity)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        except Exception:
+            with self._queue_lock:
+                self._pending[:0] = batch
+            raise
+        for write in batch:
+            write.done = True
+
+    def _insert(self, doc: Dict[str, Any], capacity: int | None) -> bool | None:
+        if self._conn.execute("SELECT 1 FROM bookings WHERE id = ?", (doc["id"],)).fetchone():
+            self._conn.execute(self.UPDATE_STATUS, doc)
+            return False
+        inserted = self._conn.execute(self.INSERT_IF_SEAT, dict(doc, capacity=capacity)).rowcount
+        return True if inserted else None
+
+    def _commit(self, writes: List[_Write]) -> None:
+        with self._queue_lock:
+            self._pending.extend(writes)
+        with self._lock:
+            # The queue commits in order, so once the last write is in, all of them are.
+            # An earlier writer holding the lock may already have committed ours.
+            while writes and not writes[-1].done:
+                self._flush_locked()
+
+    def add(self, doc: Dict[str, Any], capacity: int | None = None) -> bool:
+        write = _Write(doc, capacity)
+        self._commit([write])
+        if write.result is None:
+            raise FullyBooked(f"Tour {doc['tourId']} is fully booked on {doc['date']}")
+        return write.result
+
+    def add_many(self, docs: Iterable[Dict[str, Any]],
+                 capacity_of: Callable[[str], int | None] = lambda tour_id: None,
+                 ) -> List[bool | None]:
+        writes = [_Write(doc, capacity_of(doc["tourId"])) for doc in docs]
+        self._commit(writes)
+        return [write.result for write in writes]
+
+    def flush(self) -> None:
+        with self._lock:
+            while self._pending:
+                self._flush_locked()
+
+    @staticmethod
+    def _row_to_doc(row: tuple) -> Dict[str, Any]:
+        return {"id": row[0], "userId": row[1], "tourId": row[2], "date": row[3], "status": row[4]}
+
+    def get(self, booking_id: str) -> Dict[str, Any] | None:
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT {self.COLUMNS} FROM bookings WHERE id = ?", (booking_id,)
+            ).fetchone()
+        return self._row_to_doc(row) if row else None
+
+    def by_user(self, user_id: int) -> List[Dict[str, Any]]:
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {self.COLUMNS} FROM bookings WHERE user_id = ? ORDER BY rowid",
+                (int(user_id),),
+            ).fetchall()
+        return [self._row_to_doc(r) for r in rows]
+
+    def iter_by_user(self, user_id: int, after: int = 0,
+                     chunk_size: int = 500) -> Iterator[Tuple[int, Dict[str, Any]]]:
+        # Keyset over rowid in chunks; the lock is not held while the caller consumes rows
+        while True:
+            with self._lock:
+                rows = self._conn.execute(
+                    f"SELECT rowid, {self.COLUMNS} FROM bookings"
+                    " WHERE user_id = ? AND rowid > ? ORDER BY rowid LIMIT ?",
+                    (int(user_id), int(after), chunk_size),
+                ).fetchall()
+            for row in rows:
+                after = row[0]
+                yield after, self._row_to_doc(row[1:])
+            if len(rows) < chunk_size:
+                return
+
+    def iter_all(self, chunk_size: int = 1000) -> Iterator[Dict[str, Any]]:
+        after = 0
+        while True:
+            with self._lock:
+                rows = self._conn.execute(
+                    f"SELECT rowid, {self.COLUMNS} FROM bookings WHERE rowid > ? ORDER BY rowid LIMIT ?",
+                    (after, chunk_size),
+                ).fetchall()
+            for row in rows:
+                after = row[0]
+                yield self._row_to_doc(row[1:])
+            if len(rows) < chunk_size:
+                return
+
+    def booked(self, tour_id: str, start: dt.date, end: dt.date) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._conn.execute(
+                "SELECT date, COUNT(*) FROM bookings"
+                " WHERE tour_id = ? AND date BETWEEN ? AND ? GROUP BY date",
+                (tour_id, start.isoformat(), end.isoformat()),
+            ).fetchall())
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM bookings").fetchone()[0]
+
+    def close(self) -> None:
+        if self._closed.is_set():
+            return
+        self._closed.set()
+        with self._lock:
+            try:
+                while self._pending:
+                    self._flush_locked()
+            finally:
+                self._conn.close()
+
+
+def create_store(backend: str = "memory", **options: Any) -> BookingStore:
+    """Build a store by name: 'memory' (stripes) or 'sqlite' (path, batch_size, flush_interval)."""
+    backend = (backend or "memory").strip().lower()
+    if backend == "memory":
+        return MemoryBookingStore(stripes=options.get("stripes", 64))
+    if backend == "sqlite":
+        return SQLiteBookingStore(
+            options.get("path") or "city-tours.db",
+            batch_size=options.get("batch_size", 64),
+            flush_interval=options.get("flush_interval", 0.05),
+        )
+    raise ValueError(f"Unknown storage backend '{backend}'. Use 'memory' or 'sqlite'.")
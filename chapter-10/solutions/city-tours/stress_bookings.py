@@ -0,0 +1,141 @@
+# Hammer POST /bookings from many threads against a threaded server. Every booking targets
+# one of a few (tour, date) keys, so writers contend for the same seats and lock stripes.
+# Then check that no key holds more bookings than the tour's capacity, that every accepted
+# (201) booking landed exactly once in the store and in its user's listing, and that a
+# key only refused bookings (409) once it was full.
+#
+#   python stress_bookings.py --threads 32 --bookings 200 --users 500 --dates 3 --backend memory
+
+from __future__ import annotations
+import argparse
+import datetime as dt
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import Counter
+
+from werkzeug.serving import make_server
+
+import app as city_tours
+import seed_data as data
+
+
+def post(base: str, body: dict) -> int:
+    req = urllib.request.Request(
+        f"{base}/bookings", data=json.dumps(body).encode(),
+        headers={"Content-Type": "application/json"}, method="POST",
+    )
+    try:
+        with urllib.request.urlopen(req) as resp:
+            return resp.status
+    except urllib.error.HTTPError as err:
+        return err.code
+
+
+def get_json(url: str) -> object:
+    with urllib.request.urlopen(url) as resp:
+        return json.load(resp)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Concurrent booking stress test")
+    parser.add_argument("--threads", type=int, default=32)
+    parser.add_argument("--bookings", type=int, default=200, help="bookings per thread")
+    parser.add_argument("--users", type=int, default=500)
+    parser.add_argument("--dates", type=int, default=3, help="distinct dates booked per tour")
+    parser.add_argument("--backend", choices=["memory", "sqlite"], default="memory")
+    args = parser.parse_args()
+
+    tmp = tempfile.TemporaryDirectory()
+    app = city_tours.create_app({
+        "STORAGE_BACKEND": args.backend,
+        "SQLITE_PATH": os.path.join(tmp.name, "stress.db"),
+    })
+    for uid in range(1000, 1000 + args.users):
+        data.add_user({"id": uid, "name": f"Stress {uid}", "homeCity": "paris"})
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)  # no per-request access log
+    server = make_server("127.0.0.1", 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_port}"
+
+    tour_ids = list(data.TOURS)
+    accepted: set = set()
+    refused: Counter = Counter()
+    results_lock = threading.Lock()
+    failures: list = []
+
+    def worker(tid: int) -> None:
+        local_accepted, local_refused = set(), Counter()
+        for i in range(args.bookings):
+            n = tid * args.bookings + i
+            # Few (tour, date) keys shared by all threads; a user re-posting the same
+            # key gets the same booking id back
+            body = {"tourId": tour_ids[n % len(tour_ids)], "userId": 1000 + n % args.users,
+                    "date": (dt.date(2030, 1, 1) + dt.timedelta(days=n // len(tour_ids) % args.dates)).isoformat()}
+            try:
+                status = post(base, body)
+            except Exception as ex:
+                failures.append(f"{body}: {ex}")
+                continue
+            key = (body["tourId"], body["date"])
+            if status == 201:
+                local_accepted.add((body["userId"], *key))
+            elif status == 409:
+                local_refused[key] += 1
+            else:
+                failures.append(f"{body}: HTTP {status}")
+        with results_lock:
+            accepted.update(local_accepted)
+            refused.update(local_refused)
+
+    threads = [threading.Thread(target=worker, args=(t,)) for t in range(args.threads)]
+    t0 = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - t0
+    total = args.threads * args.bookings
+
+    # Consistency: capacity per key, store count, per-user listings, no duplicates
+    problems = []
+    per_key = Counter((tour_id, date) for _, tour_id, date in accepted)
+    for (tour_id, date), count in sorted(per_key.items() | refused.items()):
+        capacity = data.TOURS[tour_id].get("capacity")
+        day = dt.date.fromisoformat(date)
+        booked = data.STORE.booked(tour_id, day, day).get(date, 0)
+        if booked != per_key[(tour_id, date)]:
+            problems.append(f"{tour_id} {date}: store holds {booked}, {per_key[(tour_id, date)]} accepted")
+        if capacity is not None and booked > capacity:
+            problems.append(f"{tour_id} {date}: overbooked, {booked} > capacity {capacity}")
+        if refused[(tour_id, date)] and capacity is not None and booked < capacity:
+            problems.append(f"{tour_id} {date}: refused bookings with {capacity - booked} seats left")
+    if data.STORE.count() != len(accepted):
+        problems.append(f"store holds {data.STORE.count()}, expected {len(accepted)}")
+    by_user = Counter(user_id for user_id, _, _ in accepted)
+    for user_id, count in by_user.items():
+        ids = [b["id"] for b in get_json(f"{base}/bookings?userId={user_id}")]
+        if len(ids) != count or len(set(ids)) != len(ids):
+            problems.append(f"user {user_id}: {len(ids)} bookings ({len(set(ids))} unique), expected {count}")
+
+    server.shutdown()
+    data.STORE.close()
+    tmp.cleanup()
+
+    print(f"backend={args.backend} threads={args.threads} bookings={total}")
+    print(f"throughput: {total / elapsed:,.0f} requests/sec ({elapsed:.2f}s)")
+    print(f"accepted: {len(accepted)}  fully booked (409): {sum(refused.values())}")
+    print(f"failed requests: {len(failures)}")
+    print("consistency: " + ("ok" if not problems else f"{len(problems)} problem(s)"))
+    for p in problems[:10]:
+        print(f"  {p}")
+    raise SystemExit(1 if failures or problems else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,288 @@
+# Async variant of the task-board API on Quart (Flask's asyncio twin) and SQLAlchemy's
+# async engine (asyncpg for Postgres, aiosqlite for the SQLite fallback). Same routes,
+# SQL, schema and config as server.py via common.py; a request waiting on the database
+# parks a coroutine instead of holding a worker thread.
+#
+#   uvicorn async_server:app --host 0.0.0.0 --port 8080
+from __future__ import annotations
+import asyncio
+import time
+from typing import AsyncIterator, List
+
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+from quart import Quart, Response, request
+from sqlalchemy import create_engine, text
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+import common
+from changes import AsyncSubscription, ChangeFeed, backlog, head
+from common import BadRequest
+
+PORT = common.PORT
+CACHE = common.make_cache()
+
+app = Quart(__name__)
+engine = create_async_engine(
+    common.async_database_url(), **common.engine_options(common.TimedAsyncQueuePool)
+)
+common.register_pool_metrics(engine.sync_engine.pool)
+DB_HEALTH = common.DBHealth()
+health_engine = create_async_engine(
+    common.async_database_url(), **common.health_engine_options(AsyncAdaptedQueuePool)
+)
+
+# The change feed runs on threads (LISTEN blocks), so it gets its own small sync engine
+FEED = ChangeFeed(create_engine(common.DATABASE_URL, **common.health_engine_options(QueuePool)))
+
+async def _cache_call(method, *args):
+    # The Redis client is sync: with a shared cache, run its calls on a thread so a slow
+    # round-trip doesn't stall every request on the event loop. The local LRU alone is
+    # a dict lookup under a lock and runs inline.
+    if CACHE.shared:
+        return await asyncio.to_thread(method, *args)
+    return method(*args)
+
+async def _changed():
+    await _cache_call(CACHE.invalidate)
+    FEED.wake()
+
+async def _check_db():
+    t0 = time.perf_counter()
+    try:
+        async with health_engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+        DB_HEALTH.record(True, latency=time.perf_counter() - t0)
+    except Exception as err:  # see server._check_db
+        DB_HEALTH.record(False, error=type(err).__name__)
+
+async def _check_db_forever():
+    while True:
+        await _check_db()
+        await asyncio.sleep(DB_HEALTH.interval)
+
+# The schema is created and upgraded by migrate.py (a one-shot job before the API starts);
+# workers never run DDL.
+@app.before_serving
+async def start_health_checker():
+    app.health_checker = asyncio.create_task(_check_db_forever())
+
+@app.after_serving
+async def close_db():
+    app.health_checker.cancel()
+    FEED.stop()
+    await engine.dispose()
+    await health_engine.dispose()
+
+@app.errorhandler(BadRequest)
+async def bad_request(err: BadRequest):
+    return {"error": str(err)}, 400
+
+@app.get("/livez")
+async def livez():
+    return {"status": "ok"}, 200
+
+@app.get("/readyz")
+async def readyz():
+    return DB_HEALTH.readiness(engine.sync_engine.pool)
+
+@app.get("/health")
+async def health():
+    body, status = DB_HEALTH.readiness(engine.sync_engine.pool, check_pool=False)
+    return {**body, "mode": "async"}, status
+
+@app.get("/metrics")
+async def metrics():
+    return generate_latest(), 200, {"Content-Type": CONTENT_TYPE_LATEST}
+
+async def _cached(key, build):
+    """Async twin of server._cached: `build` is a coroutine function returning (payload, link)."""
+    version, entry = await _cache_call(CACHE.lookup, key)
+    if entry is None:
+        payload, link = await build()
+        entry = await _cache_call(CACHE.store, key, version, payload, link)
+    body, etag, link = entry
+    if request.if_none_match.contains_weak(etag):
+        response = Response(b"", status=304)
+    else:
+        response = Response(body, mimetype="application/json")
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = "no-cache"
+    if link:
+        response.headers["Link"] = link
+    return response
+
+@app.get("/tasks")
+async def list_tasks():
+    after_id, limit, status = common.parse_page_args(request.args)
+
+    async def build():
+        async with engine.connect() as conn:
+            result = await conn.execute(
+                common.select_page(status), common.page_params(after_id, limit, status)
+            )
+            rows = result.mappings().all()
+        return common.page_result(rows, limit, status)
+
+    return await _cached(("list", after_id, limit, status), build)
+
+@app.get("/tasks/<int:task_id>")
+async def get_task(task_id: int):
+    async def build():
+        async with engine.connect() as conn:
+            row = (await conn.execute(common.SELECT_ONE, {"id": task_id})).mappings().first()
+        if not row:
+            raise common.TaskNotFound(task_id)
+        return dict(row), None
+
+    try:
+        return await _cached(("task", task_id), build)
+    except common.TaskNotFound:
+        return {"error": "not found"}, 404
+
+async def _export_chunks(status: str) -> AsyncIterator[List[dict]]:
+    if engine.dialect.name == "postgresql":
+        async with engine.connect() as conn:
+            result = await conn.stream(
+                common.select_all(status).execution_options(yield_per=common.EXPORT_CHUNK_SIZE),
+                {"status": status},
+            )
+            async for partition in result.mappings().partitions():
+                yield [dict(r) for r in partition]
+        return
+    after_id = 0
+    while True:
+        async with engine.connect() as conn:
+            result = await conn.execute(
+                common.select_page(status),
+                {"after_id": after_id, "status": status, "limit": common.EXPORT_CHUNK_SIZE},
+            )
+            rows = result.mappings().all()
+        if not rows:
+            return
+        yield [dict(r) for r in rows]
+        after_id = rows[-1]["id"]
+
+@app.get("/tasks/export")
+async def export_tasks():
+    fmt, status = common.parse_export_args(request.args)
+    mimetype, header, encode = common.EXPORT_FORMATS[fmt]
+
+    async def lines():
+        yield header.encode()
+        async for chunk in _export_chunks(status):
+            yield encode(chunk).encode()
+
+    return Response(lines(), mimetype=mimetype, headers=common.export_headers(fmt))
+
+@app.get("/tasks/changes")
+async def task_changes():
+    # Server-sent events; see server.task_changes. An open stream here is a parked coroutine.
+    since = common.parse_since(request.args, request.headers)
+
+    async def events():
+        sub = AsyncSubscription(asyncio.get_running_loop())
+        try:
+            await asyncio.to_thread(FEED.subscribe, sub)  # the first one starts the feed (a query)
+            last = since
+            if last is None:
+                async with engine.connect() as conn:
+                    last = await conn.run_sync(head)
+            yield common.SSE_HEARTBEAT.encode()  # headers out: the client is subscribed
+            while True:
+                async with engine.connect() as conn:
+                    batch = await conn.run_sync(backlog, last)
+                if not batch:
+                    break
+                for change in batch:
+                    yield common.sse_event(change).encode()
+                last = batch[-1]["revision"]
+            while not sub.dropped or not sub.queue.empty():
+                batch = await sub.get(common.CHANGES_HEARTBEAT)
+                if batch is None:
+                    yield common.SSE_HEARTBEAT.encode()
+                    continue
+                for change in batch:
+                    if change["revision"] > last:
+                        yield common.sse_event(change).encode()
+                        last = change["revision"]
+        finally:
+            FEED.unsubscribe(sub)
+
+    response = Response(events(), mimetype="text/event-stream", headers=common.SSE_HEADERS)
+    response.timeout = None  # Quart cuts responses off after 60 s by default
+    return response
+
+@app.post("/tasks")
+async def create_task():
+    title, status = common.parse_new_task(await request.get_json(silent=True))
+    async with engine.begin() as conn:
+        result = await conn.execute(common.INSERT, {"title": title, "status": status})
+        row = result.mappings().first()
+        await conn.run_sync(common.record_changes, "create", [row])
+    await _changed()
+    return dict(row), 201
+
+@app.post("/tasks/bulk")
+async def create_tasks_bulk():
+    rows = common.parse_bulk_create(await request.get_json(silent=True))
+    async with engine.begin() as conn:
+        result = (await conn.execute(common.INSERT, common.insert_rows(rows))).mappings().all()
+        created = sorted((dict(r) for r in result), key=lambda r: r["id"])
+        await conn.run_sync(common.record_changes, "create", created)
+    await _changed()
+    return {"created": created}, 201
+
+@app.patch("/tasks/bulk")
+async def update_tasks_bulk():
+    rows = common.parse_bulk_update(await request.get_json(silent=True))
+    updated = []
+    async with engine.begin() as conn:
+        for chunk in common.chunks(list(rows.values())):
+            result = await conn.execute(*common.update_many(chunk))
+            updated.extend(dict(r) for r in result.mappings())
+        updated.sort(key=lambda r: r["id"])
+        await conn.run_sync(common.record_changes, "update", updated)
+    await _changed()
+    found = {r["id"] for r in updated}
+    return {"updated": updated, "notFound": [i for i in rows if i not in found]}, 200
+
+@app.delete("/tasks/bulk")
+async def delete_tasks_bulk():
+    ids = common.parse_bulk_delete(await request.get_json(silent=True))
+    deleted = set()
+    async with engine.begin() as conn:
+        for chunk in common.chunks(ids):
+            deleted.update((await conn.execute(common.DELETE_MANY, {"ids": chunk})).scalars())
+        await conn.run_sync(common.record_changes, "delete", [{"id": i} for i in ids if i in deleted])
+    await _changed()
+    return {"deleted": len(deleted), "notFound": [i for i in ids if i not in deleted]}, 200
+
+@app.patch("/tasks/<int:task_id>")
+async def update_task(task_id: int):
+    fields = common.parse_changes(await request.get_json(silent=True))
+    async with engine.begin() as conn:
+        result = await conn.execute(common.UPDATE_ONE, common.update_params(task_id, fields))
+        row = result.mappings().first()
+        if not row:
+            return {"error": "not found"}, 404
+        await conn.run_sync(common.record_changes, "update", [row])
+    await _changed()
+    return dict(row), 200
+
+@app.delete("/tasks/<int:task_id>")
+async def delete_task(task_id: int):
+    async with engine.begin() as conn:
+        result = (await conn.execute(common.DELETE_ONE, {"id": task_id})).first()
+        if not result:
+            return {"error": "not found"}, 404
+        await conn.run_sync(common.record_changes, "delete", [{"id": task_id}])
+    await _changed()
+    return {"status": "deleted"}, 200
+
+if __name__ == "__main__":
+    import migrate
+    import uvicorn
+    # Local runs bring the schema up to date first, like the compose stack's migrate job
+    migrate.upgrade(create_engine(common.DATABASE_URL))
+    uvicorn.run(app, host="0.0.0.0", port=PORT)
@@ -0,0 +1,137 @@
+# Read-through cache for task-board GET responses.
+#
+# Entries hold the encoded JSON body, its ETag and any Link header, so a hit is served (or
+# answered with 304) without touching the database or re-encoding. Every write bumps a
+# version number; entries built under an older version are never served again.
+#
+# Two tiers:
+#   * an in-process LRU with a TTL (always, unless API_CACHE_TTL=0)
+#   * optionally a shared Redis (API_CACHE_URL=redis://...) holding the version and the
+#     entries, so several gunicorn workers or pods see each other's writes at once.
+#     Without it, a worker only sees its own writes and serves others' after the TTL.
+
+from __future__ import annotations
+
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional, Tuple
+
+try:
+    import redis
+except ImportError:  # only needed with API_CACHE_URL
+    redis = None
+
+Entry = Tuple[bytes, str, Optional[str]]  # (body, etag, Link header)
+
+
+def encode(payload: Any) -> Tuple[bytes, str]:
+    body = json.dumps(payload, separators=(",", ":")).encode() + b"\n"
+    return body, hashlib.blake2b(body, digest_size=12).hexdigest()
+
+
+class TaskCache:
+    def __init__(self, ttl: float, max_entries: int, shared_url: Optional[str] = None,
+                 prefix: str = "taskboard:cache:") -> None:
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self._local: "OrderedDict[Hashable, Tuple[float, int, Entry]]" = OrderedDict()
+        self._version = 0
+        self._shared = None
+        if shared_url and ttl > 0:
+            if redis is None:
+                raise RuntimeError("API_CACHE_URL is set but the redis package is not installed")
+            self._shared = redis.Redis.from_url(shared_url, socket_timeout=0.25)
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0 and self.max_entries > 0
+
+    @property
+    def shared(self) -> bool:
+        """lookup(), store() and invalidate() make blocking Redis round-trips."""
+        return self._shared is not None
+
+    def _current_version(self) -> Optional[int]:
+        """None when the shared backend is unreachable: bypass the cache rather than risk
+        serving data another worker has already changed."""
+        if self._shared is None:
+            return self._version
+        try:
+            return int(self._shared.get(self.prefix + "version") or 0)
+        except redis.RedisError:
+            return None
+
+    def _shared_key(self, key: Hashable, version: int) -> str:
+        return f"{self.prefix}{version}:{json.dumps(key, separators=(',', ':'))}"
+
+    def lookup(self, key: Hashable) -> Tuple[Optional[int], Optional[Entry]]:
+        """(version, entry): entry is None on a miss, version is None when caching is off.
+        Build on a miss, then hand the version back to store()."""
+        version = self._current_version() if self.enabled else None
+        if version is None:
+            return None, None
+        with self._lock:
+            hit = self._local.get(key)
+            if hit and hit[0] > time.monotonic() and hit[1] == version:
+                self._local.move_to_end(key)
+                return version, hit[2]
+        if self._shared is not None:
+            try:
+                stored = self._shared.hgetall(self._shared_key(key, version))
+            except redis.RedisError:
+                stored = None
+            if stored:
+                entry = (stored[b"body"], stored[b"etag"].decode(), stored[b"link"].decode() or None)
+                self._remember(key, version, entry)
+                return version, entry
+        return version, None
+
+    def store(self, key: Hashable, version: Optional[int], payload: Any, link: Optional[str]) -> Entry:
+        """Encode and keep a freshly built response. `version` is the one lookup() saw before
+        the build: if a write landed meanwhile, the entry is filed under the old version and
+        simply never read."""
+        entry = (*encode(payload), link)
+        if version is None:
+            return entry
+        if self._shared is not None:
+            try:
+                name = self._shared_key(key, version)
+                pipe = self._shared.pipeline()
+                pipe.hset(name, mapping={"body": entry[0], "etag": entry[1], "link": link or ""})
+                pipe.expire(name, max(1, int(self.ttl)))
+                pipe.execute()
+            except redis.RedisError:
+                pass
+        self._remember(key, version, entry)
+        return entry
+
+    def _remember(self, key: Hashable, version: int, entry: Entry) -> None:
+        with self._lock:
+            self._local[key] = (time.monotonic() + self.ttl, version, entry)
+            self._local.move_to_end(key)
+            while len(self._local) > self.max_entries:
+                self._local.popitem(last=False)
+
+    def get(self, key: Hashable, build: Callable[[], Tuple[Any, Optional[str]]]) -> Entry:
+        """Cached (body, etag, link) for `key`; on a miss `build()` returns (payload, link)."""
+        version, entry = self.lookup(key)
+        if entry is not None:
+            return entry
+        payload, link = build()
+        return self.store(key, version, payload, link)
+
+    def invalidate(self) -> None:
+        """Call after every committed write."""
+        with self._lock:
+            self._version += 1
+            self._local.clear()
+        if self._shared is not None:
+            try:
+                self._shared.incr(self.prefix + "version")
+            except redis.RedisError:
+                pass
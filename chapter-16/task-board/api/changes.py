@@ -0,0 +1,168 @@
+# Fan-out for GET /tasks/changes.
+#
+# Every write appends task_changes rows (common.record_changes) in its own transaction.
+# One ChangeFeed per process reads rows past the last revision it has seen and hands each
+# batch to every open stream, so N listening clients cost one query per change, not N.
+#
+# The feed reads when it is woken, and at least every CHANGES_POLL_INTERVAL seconds as a
+# safety net:
+#   - Postgres: a LISTEN task_changes session on its own connection; writers NOTIFY on
+#     commit, so a write in any worker or replica wakes every process.
+#   - SQLite (local, single process): the API calls wake() after each committed write.
+#
+# Streams start by replaying their backlog from the table (?since= / Last-Event-ID), then
+# switch to the feed; the feed is subscribed to first, so no revision falls in between.
+from __future__ import annotations
+import asyncio
+import logging
+import queue
+import threading
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import SQLAlchemyError
+
+import common
+
+log = logging.getLogger("taskboard.changes")
+
+Batch = List[Dict[str, Any]]
+
+
+class Subscription:
+    """One stream's buffer, read by a worker thread (Flask)."""
+
+    def __init__(self, maxsize: int = common.CHANGES_BUFFER) -> None:
+        self.queue: "queue.Queue[Batch]" = queue.Queue(maxsize)
+        self.dropped = False
+
+    def deliver(self, batch: Batch) -> bool:
+        """Called on the feed thread; False drops the subscription (the client is too slow)."""
+        try:
+            self.queue.put_nowait(batch)
+            return True
+        except queue.Full:
+            self.dropped = True
+            return False
+
+    def get(self, timeout: float) -> Optional[Batch]:
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+
+class AsyncSubscription:
+    """One stream's buffer, read by a coroutine (Quart) on the given event loop."""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, maxsize: int = common.CHANGES_BUFFER) -> None:
+        self.loop = loop
+        self.queue: "asyncio.Queue[Batch]" = asyncio.Queue(maxsize)
+        self.dropped = False
+
+    def deliver(self, batch: Batch) -> bool:
+        try:
+            self.loop.call_soon_threadsafe(self._put, batch)
+        except RuntimeError:  # the loop has closed (server shutting down)
+            return False
+        return not self.dropped
+
+    def _put(self, batch: Batch) -> None:
+        try:
+            self.queue.put_nowait(batch)
+        except asyncio.QueueFull:
+            self.dropped = True
+
+    async def get(self, timeout: float) -> Optional[Batch]:
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+def backlog(conn, after: int, limit: int = common.CHANGES_BATCH) -> Batch:
+    rows = conn.execute(common.SELECT_CHANGES, {"after": after, "limit": limit}).mappings()
+    return [dict(r) for r in rows]
+
+
+def head(conn) -> int:
+    return conn.execute(common.SELECT_HEAD).scalar_one()
+
+
+class ChangeFeed:
+    """Reads new task_changes rows and delivers them to subscribers. Its threads start with
+    the first subscriber, so workers that never serve a stream never poll."""
+
+    def __init__(self, engine: Engine, poll_interval: float = common.CHANGES_POLL_INTERVAL) -> None:
+        self.engine = engine
+        self.poll_interval = poll_interval
+        self._subscribers: set = set()
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._started = False
+
+    def subscribe(self, sub) -> None:
+        with self._lock:
+            self._subscribers.add(sub)
+            if not self._started:
+                self._start()  # may raise (database unreachable): the next subscriber retries
+                self._started = True
+
+    def unsubscribe(self, sub) -> None:
+        with self._lock:
+            self._subscribers.discard(sub)
+
+    def wake(self) -> None:
+        self._wake.set()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._wake.set()
+
+    def _start(self) -> None:
+        # Start from the current head: older changes are each stream's own backlog query
+        with self.engine.connect() as conn:
+            last = head(conn)
+        threading.Thread(target=self._run, args=(last,), name="changes-feed", daemon=True).start()
+        if self.engine.dialect.name == "postgresql":
+            threading.Thread(target=self._listen, name="changes-listen", daemon=True).start()
+
+    def _run(self, last: int) -> None:
+        while not self._stop.is_set():
+            self._wake.wait(self.poll_interval)
+            self._wake.clear()
+            try:
+                while True:
+                    with self.engine.connect() as conn:
+                        batch = backlog(conn, last)
+                    if not batch:
+                        break
+                    last = batch[-1]["revision"]
+                    self._publish(batch)
+            except SQLAlchemyError as err:
+                # Subscribers keep their place; the next poll picks up from `last`
+                log.warning("change feed read failed: %s", err)
+
+    def _publish(self, batch: Batch) -> None:
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for sub in subscribers:
+            if not sub.deliver(batch):
+                self.unsubscribe(sub)
+
+    def _listen(self) -> None:
+        import psycopg
+
+        conninfo = self.engine.url.set(drivername="postgresql").render_as_string(hide_password=False)
+        while not self._stop.is_set():
+            try:
+                with psycopg.connect(conninfo, autocommit=True) as conn:
+                    conn.execute("LISTEN task_changes")
+                    self.wake()  # catch up on anything committed while we weren't listening
+                    while not self._stop.is_set():
+                        for _ in conn.notifies(timeout=self.poll_interval):
+                            self.wake()
+            except psycopg.Error as err:
+                log.warning("LISTEN task_changes failed, retrying: %s", err)
+                self._stop.wait(self.poll_interval)
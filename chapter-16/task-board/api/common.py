@@ -0,0 +1,552 @@
+# Everything the sync (server.py, Flask) and async (async_server.py, Quart) task-board APIs
+# share: env config, pool setup and metrics, the SQL and request validation. The schema
+# itself is owned by migrate.py.
+# Only the framework glue and the way statements are awaited differ between the two.
+from __future__ import annotations
+import csv
+import functools
+import io
+import json
+import os
+import time
+import zlib
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from urllib.parse import urlencode
+
+from prometheus_client import Counter, Gauge, Histogram
+from sqlalchemy import (
+    BigInteger, Column, DateTime, Integer, MetaData, Table, Text, bindparam, delete, event, func, insert,
+    select, text, update,
+)
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import TimeoutError as PoolTimeout
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+from cache import TaskCache
+
+VERSION = "1.2.0"
+
+# Config via env (works in Docker, docker-compose, Kubernetes)
+PORT = int(os.getenv("API_PORT", "8080"))
+LOG_LEVEL = os.getenv("API_LOG_LEVEL", "info")
+# Prefer DATABASE_URL (e.g., postgres://user:pass@db:5432/taskboard); fall back to SQLite for quick local runs
+DATABASE_URL = os.getenv("DATABASE_URL")
+if not DATABASE_URL:
+    db_host = os.getenv("DB_HOST")
+    db_name = os.getenv("DB_NAME", "taskboard")
+    db_user = os.getenv("DB_USER")
+    db_pass = os.getenv("DB_PASSWORD")
+    if db_host and db_user and db_pass:
+        DATABASE_URL = f"postgresql+psycopg://{db_user}:{db_pass}@{db_host}:5432/{db_name}"
+    else:
+        DATABASE_URL = f"sqlite+pysqlite:///./{db_name}.db"
+# GET /tasks is paged: a page holds PAGE_SIZE tasks unless ?limit= asks for more (up to MAX_PAGE_SIZE)
+PAGE_SIZE = int(os.getenv("API_PAGE_SIZE", "100"))
+MAX_PAGE_SIZE = int(os.getenv("API_MAX_PAGE_SIZE", "1000"))
+# GET /tasks/export fetches and writes this many rows at a time
+EXPORT_CHUNK_SIZE = int(os.getenv("API_EXPORT_CHUNK_SIZE", "5000"))
+# /tasks/bulk takes up to MAX_BULK_SIZE items; updates and deletes go BULK_CHUNK_SIZE rows
+# per statement (keeps bind parameters under SQLite's per-statement limit)
+MAX_BULK_SIZE = int(os.getenv("API_MAX_BULK_SIZE", "10000"))
+BULK_CHUNK_SIZE = 500
+
+# Connection pool. Size it so (workers x (POOL_SIZE + MAX_OVERFLOW)) stays under Postgres max_connections.
+DB_POOL_SIZE = int(os.getenv("API_DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("API_DB_MAX_OVERFLOW", "10"))
+DB_POOL_RECYCLE = int(os.getenv("API_DB_POOL_RECYCLE", "-1"))  # seconds; -1 keeps connections forever
+DB_POOL_TIMEOUT = float(os.getenv("API_DB_POOL_TIMEOUT", "30"))  # seconds to wait for a free connection
+# pessimistic: ping each connection on checkout (one extra round-trip, never hands out a dead one)
+# optimistic: no ping; a dead connection fails its request and the pool is invalidated and refilled
+DB_DISCONNECT_MODE = os.getenv("API_DB_DISCONNECT_MODE", "pessimistic").lower()
+if DB_DISCONNECT_MODE not in ("pessimistic", "optimistic"):
+    raise ValueError("API_DB_DISCONNECT_MODE must be pessimistic or optimistic")
+
+# /readyz and /health report the result of a background "SELECT 1" run every HEALTH_INTERVAL
+# seconds on its own single connection, so probes never take a connection from the pool
+HEALTH_INTERVAL = float(os.getenv("API_HEALTH_INTERVAL", "5"))
+
+# GET /tasks/changes (server-sent events). Each process reads new task_changes rows when a
+# write wakes it (Postgres NOTIFY, or a write in the same process) and at least every
+# CHANGES_POLL_INTERVAL seconds; idle streams get a comment line every CHANGES_HEARTBEAT
+# seconds so proxies keep them open. A client that falls CHANGES_BUFFER batches behind is
+# disconnected and resumes from its last event id.
+CHANGES_POLL_INTERVAL = float(os.getenv("API_CHANGES_POLL_INTERVAL", "5"))
+CHANGES_HEARTBEAT = float(os.getenv("API_CHANGES_HEARTBEAT", "15"))
+CHANGES_BUFFER = int(os.getenv("API_CHANGES_BUFFER", "256"))
+CHANGES_BATCH = 1000
+# server.py (gthread) holds a thread per open stream, so it serves at most
+# CHANGES_MAX_STREAMS per process and answers 503 with Retry-After beyond that: streams
+# can't take every thread from ordinary requests. 0 lifts the cap. async_server.py parks
+# a coroutine per stream and has no cap; run it when many clients watch the board.
+CHANGES_MAX_STREAMS = int(os.getenv("API_CHANGES_MAX_STREAMS", "16"))
+CHANGES_RETRY_AFTER = 5  # seconds
+
+# Drivers the async app swaps in for the sync ones named in DATABASE_URL
+ASYNC_DRIVERS = {"postgresql": "asyncpg", "sqlite": "aiosqlite"}
+
+
+def async_database_url(url: str = DATABASE_URL) -> str:
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"no async driver configured for {backend}")
+    return parsed.set(drivername=f"{backend}+{ASYNC_DRIVERS[backend]}").render_as_string(hide_password=False)
+
+
+def make_cache() -> TaskCache:
+    # GET /tasks and GET /tasks/<id> responses are cached for API_CACHE_TTL seconds (0 disables);
+    # API_CACHE_URL=redis://... shares the cache and its invalidations between workers
+    return TaskCache(
+        ttl=float(os.getenv("API_CACHE_TTL", "5")),
+        max_entries=int(os.getenv("API_CACHE_SIZE", "1024")),
+        shared_url=os.getenv("API_CACHE_URL"),
+    )
+
+
+# -----------------
+# Pool and metrics
+# -----------------
+POOL_CHECKOUT = Histogram(
+    "taskboard_db_pool_checkout_seconds",
+    "Time spent waiting for a pooled connection (including opening a new one)",
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+POOL_TIMEOUTS = Counter(
+    "taskboard_db_pool_timeouts_total",
+    "Checkouts that gave up after API_DB_POOL_TIMEOUT",
+)
+POOL_INVALIDATIONS = Counter(
+    "taskboard_db_pool_invalidations_total",
+    "Connections discarded after a disconnect or error",
+)
+POOL_IN_USE = Gauge("taskboard_db_pool_in_use", "Connections checked out right now")
+POOL_IDLE = Gauge("taskboard_db_pool_idle", "Open connections waiting in the pool")
+POOL_OVERFLOW = Gauge("taskboard_db_pool_overflow", "Connections open beyond pool_size")
+Gauge("taskboard_db_pool_size", "Configured pool size").set(DB_POOL_SIZE)
+Gauge("taskboard_db_pool_max_overflow", "Configured overflow limit").set(DB_MAX_OVERFLOW)
+
+
+class _TimedCheckout:
+    """Pool mixin that records how long each checkout waited."""
+
+    def _do_get(self):
+        t0 = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeout:
+            POOL_TIMEOUTS.inc()
+            raise
+        finally:
+            POOL_CHECKOUT.observe(time.perf_counter() - t0)
+
+
+class TimedQueuePool(_TimedCheckout, QueuePool):
+    pass
+
+
+class TimedAsyncQueuePool(_TimedCheckout, AsyncAdaptedQueuePool):
+    pass
+
+
+def engine_options(poolclass: type) -> Dict[str, Any]:
+    """Keyword arguments for create_engine / create_async_engine."""
+    return {
+        "poolclass": poolclass,
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_pre_ping": DB_DISCONNECT_MODE == "pessimistic",
+    }
+
+
+def register_pool_metrics(pool: QueuePool) -> None:
+    event.listen(pool, "invalidate", lambda *args: POOL_INVALIDATIONS.inc())
+    POOL_IN_USE.set_function(pool.checkedout)
+    POOL_IDLE.set_function(pool.checkedin)
+    # QueuePool.overflow() counts up from -pool_size; only connections beyond pool_size are overflow
+    POOL_OVERFLOW.set_function(lambda: max(0, pool.overflow()))
+
+
+def pool_saturated(pool: QueuePool) -> bool:
+    """Every connection the pool may open is checked out: new requests would queue."""
+    if DB_MAX_OVERFLOW < 0:  # unlimited overflow never saturates
+        return False
+    return pool.checkedout() >= pool.size() + DB_MAX_OVERFLOW
+
+
+# -------
+# Health
+# -------
+def health_engine_options(poolclass: type) -> Dict[str, Any]:
+    """Engine for the background checker: one connection, never shared with traffic."""
+    return {"poolclass": poolclass, "pool_size": 1, "max_overflow": 0, "pool_timeout": HEALTH_INTERVAL}
+
+
+class DBHealth:
+    """Last result of the background database check, read by the probe endpoints."""
+
+    def __init__(self, interval: float = HEALTH_INTERVAL) -> None:
+        self.interval = interval
+        self.ok = False
+        self.error: Optional[str] = "not checked yet"
+        self.latency: Optional[float] = None
+        self.checked_at: Optional[float] = None
+
+    def record(self, ok: bool, latency: Optional[float] = None, error: Optional[str] = None) -> None:
+        self.ok, self.latency, self.error = ok, latency, error
+        self.checked_at = time.monotonic()
+
+    def readiness(self, pool: QueuePool, check_pool: bool = True) -> Tuple[Dict[str, Any], int]:
+        """(body, status) for /readyz. Not ready when the last check failed, when the checker
+        has stalled (no result for three intervals) or when the pool is exhausted, so the
+        load balancer stops sending traffic we could only queue. check_pool=False (/health)
+        leaves the pool out: liveness probes still point there, and a pod that is merely
+        busy must not be restarted."""
+        age = None if self.checked_at is None else time.monotonic() - self.checked_at
+        stale = age is None or age > 3 * self.interval
+        saturated = pool_saturated(pool)
+        ready = self.ok and not stale and not (check_pool and saturated)
+        body = {
+            "status": "ok" if ready else "degraded",
+            "version": VERSION,
+            "db": {
+                "ok": self.ok and not stale,
+                "error": "health check stalled" if self.ok and stale else self.error,
+                "checkedSecondsAgo": None if age is None else round(age, 1),
+                "latencyMs": None if self.latency is None else round(self.latency * 1000, 2),
+            },
+            "pool": {"inUse": pool.checkedout(), "saturated": saturated},
+        }
+        return body, 200 if ready else 503
+
+
+# ----
+# SQL
+# ----
+# Statements are built once at import and reused by every request. SQLAlchemy compiles each
+# one a single time per dialect (its compiled cache is keyed on the statement's structure)
+# and the SQL string sent is identical on every call, so psycopg3 switches it to a
+# server-side prepared statement after a few executions on a connection (prepare_threshold)
+# and asyncpg serves it from its statement cache.
+metadata = MetaData()
+tasks = Table(
+    "tasks",
+    metadata,
+    Column("id", Integer, primary_key=True),
+    Column("title", Text, nullable=False),
+    Column("status", Text, nullable=False, server_default="todo"),
+    Column("updated_at", DateTime),
+)
+COLUMNS = (tasks.c.id, tasks.c.title, tasks.c.status)
+# One row per created/updated/deleted task; revision orders them for GET /tasks/changes
+task_changes = Table(
+    "task_changes",
+    metadata,
+    Column("revision", BigInteger().with_variant(Integer, "sqlite"), primary_key=True),
+    Column("task_id", Integer, nullable=False),
+    Column("op", Text, nullable=False),
+    Column("title", Text),
+    Column("status", Text),
+    Column("changed_at", DateTime, server_default=func.current_timestamp()),
+)
+
+SELECT_ONE = select(*COLUMNS).where(tasks.c.id == bindparam("id"))
+# One extra row (limit + 1) tells us whether another page exists without a COUNT(*)
+SELECT_PAGE = (
+    select(*COLUMNS)
+    .where(tasks.c.id > bindparam("after_id"))
+    .order_by(tasks.c.id)
+    .limit(bindparam("limit", type_=Integer))
+)
+SELECT_PAGE_BY_STATUS = SELECT_PAGE.where(tasks.c.status == bindparam("status"))
+SELECT_ALL = select(*COLUMNS).order_by(tasks.c.id)
+SELECT_ALL_BY_STATUS = SELECT_ALL.where(tasks.c.status == bindparam("status"))
+# Takes one {"title", "status"} dict, or a list of them: SQLAlchemy then batches the list into
+# multi-row INSERT ... VALUES ... RETURNING statements ("insertmanyvalues"). RETURNING order
+# isn't guaranteed, but ids are handed out in VALUES order: sort the rows by id. (Asking
+# SQLAlchemy for input order with sort_by_parameter_order drops SQLite to a row per statement.)
+INSERT = insert(tasks).values(updated_at=func.current_timestamp()).returning(*COLUMNS)
+# One statement for any combination of fields: a NULL parameter keeps the current value,
+# instead of a new SET clause (and a new SQL string) per combination
+UPDATE_ONE = (
+    update(tasks)
+    .where(tasks.c.id == bindparam("task_id"))
+    .values(
+        title=func.coalesce(bindparam("new_title", type_=Text), tasks.c.title),
+        status=func.coalesce(bindparam("new_status", type_=Text), tasks.c.status),
+        updated_at=func.current_timestamp(),
+    )
+    .returning(*COLUMNS)
+)
+DELETE_ONE = delete(tasks).where(tasks.c.id == bindparam("id")).returning(tasks.c.id)
+DELETE_MANY = delete(tasks).where(tasks.c.id.in_(bindparam("ids", expanding=True))).returning(tasks.c.id)
+
+INSERT_CHANGES = insert(task_changes)
+SELECT_CHANGES = (
+    select(task_changes.c.revision, task_changes.c.task_id, task_changes.c.op,
+           task_changes.c.title, task_changes.c.status)
+    .where(task_changes.c.revision > bindparam("after"))
+    .order_by(task_changes.c.revision)
+    .limit(bindparam("limit", type_=Integer))
+)
+SELECT_HEAD = select(func.coalesce(func.max(task_changes.c.revision), 0))
+# Postgres: revisions come from an identity column, handed out at INSERT but visible at
+# COMMIT, so two concurrent writers could commit 8 before 7 and a reader at 8 would never
+# see 7. Writers take this transaction-scoped lock just before logging their changes and
+# keep it until commit, so revisions become visible in order. (SQLite has one writer anyway.)
+CHANGES_LOCK_KEY = zlib.crc32(b"taskboard-task-changes")
+LOCK_CHANGES = text("SELECT pg_advisory_xact_lock(:key)").bindparams(key=CHANGES_LOCK_KEY)
+# Delivered to LISTEN task_changes sessions when the transaction commits
+NOTIFY_CHANGES = text("SELECT pg_notify('task_changes', '')")
+
+
+def select_page(status: str):
+    return SELECT_PAGE_BY_STATUS if status else SELECT_PAGE
+
+
+def select_all(status: str):
+    return SELECT_ALL_BY_STATUS if status else SELECT_ALL
+
+
+def update_params(task_id: int, fields: Dict[str, str]) -> Dict[str, Any]:
+    return {"task_id": task_id, "new_title": fields.get("title"), "new_status": fields.get("status")}
+
+
+def insert_rows(rows: List[Tuple[str, str]]) -> List[Dict[str, str]]:
+    return [{"title": title, "status": status} for title, status in rows]
+
+
+@functools.lru_cache(maxsize=8)
+def _update_many(n: int):
+    """UPDATE ... FROM a VALUES list joins every change in one statement; the CTE names the
+    columns portably (Postgres and SQLite >= 3.33). NULL keeps the current value. Built once
+    per row count, so full chunks always reuse the same statement."""
+    values = ", ".join(
+        f"(CAST(:i{i} AS INTEGER), CAST(:t{i} AS TEXT), CAST(:s{i} AS TEXT))" for i in range(n)
+    )
+    return text(
+        f"WITH v (id, title, status) AS (VALUES {values}) "
+        "UPDATE tasks SET title = COALESCE(v.title, tasks.title), "
+        "status = COALESCE(v.status, tasks.status), updated_at = CURRENT_TIMESTAMP "
+        "FROM v WHERE tasks.id = v.id "
+        "RETURNING tasks.id, tasks.title, tasks.status"
+    )
+
+
+def update_many(chunk: List[Tuple[int, Optional[str], Optional[str]]]):
+    params = {}
+    for i, (task_id, title, status) in enumerate(chunk):
+        params[f"i{i}"], params[f"t{i}"], params[f"s{i}"] = task_id, title, status
+    return _update_many(len(chunk)), params
+
+
+def record_changes(conn, op: str, rows: List[Dict[str, Any]]) -> None:
+    """Log one task_changes row per task (op is create, update or delete) in the caller's
+    transaction. The async app calls it through AsyncConnection.run_sync."""
+    if not rows:
+        return
+    postgres = conn.dialect.name == "postgresql"
+    if postgres:
+        conn.execute(LOCK_CHANGES)
+    conn.execute(INSERT_CHANGES, [
+        {"task_id": r["id"], "op": op, "title": r.get("title"), "status": r.get("status")}
+        for r in rows
+    ])
+    if postgres:
+        conn.execute(NOTIFY_CHANGES)
+
+
+def chunks(items: list, size: int = BULK_CHUNK_SIZE) -> Iterator[list]:
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+# ------------------
+# Request validation
+# ------------------
+class BadRequest(ValueError):
+    """Invalid input; both apps turn it into a 400 {"error": ...}."""
+
+
+class TaskNotFound(LookupError):
+    pass
+
+
+def _int_arg(args, name: str, default: int) -> int:
+    # Not args.get(type=int): that quietly falls back to the default on "abc"
+    value = args.get(name)
+    if value is None or value == "":
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        raise BadRequest(f"{name} must be an integer")
+
+
+def parse_page_args(args) -> Tuple[int, int, str]:
+    """(after_id, limit, status) from GET /tasks query args."""
+    after_id = _int_arg(args, "after_id", 0)
+    limit = _int_arg(args, "limit", PAGE_SIZE)
+    status = (args.get("status") or "").strip()
+    if after_id < 0 or not 1 <= limit <= MAX_PAGE_SIZE:
+        raise BadRequest(f"after_id must be >= 0 and limit between 1 and {MAX_PAGE_SIZE}")
+    return after_id, limit, status
+
+
+def page_params(after_id: int, limit: int, status: str) -> Dict[str, Any]:
+    return {"after_id": after_id, "status": status, "limit": limit + 1}
+
+
+def page_result(rows, limit: int, status: str) -> Tuple[List[dict], Optional[str]]:
+    """The page's tasks and, if more follow, the Link header pointing at the next page."""
+    tasks = [dict(r) for r in rows[:limit]]
+    link = None
+    if len(rows) > limit:
+        query = {"after_id": tasks[-1]["id"], "limit": limit}
+        if status:
+            query["status"] = status
+        # Relative, so it resolves under whatever prefix a proxy mounts us at (e.g. /api/)
+        link = f'<tasks?{urlencode(query)}>; rel="next"'
+    return tasks, link
+
+
+def _text(data: Dict[str, Any], name: str) -> str:
+    """A string field, stripped; missing or null reads as ""."""
+    value = data.get(name)
+    if value is None:
+        return ""
+    if not isinstance(value, str):
+        raise BadRequest(f"{name} must be a string")
+    return value.strip()
+
+
+def parse_new_task(data: Any) -> Tuple[str, str]:
+    data = data if isinstance(data, dict) else {}
+    title = _text(data, "title")
+    if not title:
+        raise BadRequest("title is required")
+    return title, _text(data, "status") or "todo"
+
+
+def parse_changes(data: Any) -> Dict[str, str]:
+    data = data if isinstance(data, dict) else {}
+    fields = {}
+    if "title" in data:
+        fields["title"] = _text(data, "title")
+    if "status" in data:
+        fields["status"] = _text(data, "status")
+    if not fields:
+        raise BadRequest("no fields to update")
+    return fields
+
+
+def _bulk_items(items: Any) -> list:
+    if not isinstance(items, list) or not items:
+        raise BadRequest("expected a non-empty JSON array")
+    if len(items) > MAX_BULK_SIZE:
+        raise BadRequest(f"at most {MAX_BULK_SIZE} items per request")
+    return items
+
+
+def _is_id(value: Any) -> bool:
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def parse_bulk_create(items: Any) -> List[Tuple[str, str]]:
+    """[{"title": ..., "status": ...}, ...] -> all valid, or BadRequest naming the first bad item."""
+    rows = []
+    for i, item in enumerate(_bulk_items(items)):
+        try:
+            rows.append(parse_new_task(item))
+        except BadRequest as err:
+            raise BadRequest(f"item {i}: {err}")
+    return rows
+
+
+def parse_bulk_update(items: Any) -> Dict[int, Tuple[int, Optional[str], Optional[str]]]:
+    """[{"id": 1, "status": "done"}, ...] -> {id: (id, title or None, status or None)}."""
+    rows = {}
+    for i, item in enumerate(_bulk_items(items)):
+        task_id = item.get("id") if isinstance(item, dict) else None
+        if not _is_id(task_id):
+            raise BadRequest(f"item {i}: integer id is required")
+        if task_id in rows:
+            raise BadRequest(f"item {i}: duplicate id {task_id}")
+        try:
+            fields = parse_changes(item)
+        except BadRequest as err:
+            raise BadRequest(f"item {i}: {err}")
+        rows[task_id] = (task_id, fields.get("title"), fields.get("status"))
+    return rows
+
+
+def parse_bulk_delete(items: Any) -> List[int]:
+    """[1, 2, 3] -> the distinct ids, in order."""
+    ids = _bulk_items(items)
+    if not all(_is_id(i) for i in ids):
+        raise BadRequest("expected an array of integer ids")
+    return list(dict.fromkeys(ids))
+
+
+# --------------
+# Change stream
+# --------------
+def parse_since(args, headers) -> Optional[int]:
+    """Revision to resume after: ?since=, else the Last-Event-ID an EventSource sends when it
+    reconnects; None starts at the current head (only changes made from now on)."""
+    since = args.get("since") or headers.get("Last-Event-ID")
+    if since is None or since == "":
+        return None
+    try:
+        since = int(since)
+    except ValueError:
+        raise BadRequest("since must be a revision number")
+    if since < 0:
+        raise BadRequest("since must be >= 0")
+    return since
+
+
+def sse_event(change: Dict[str, Any]) -> str:
+    task = {"id": change["task_id"]}
+    if change["op"] != "delete":
+        task.update(title=change["title"], status=change["status"])
+    data = json.dumps({"revision": change["revision"], "op": change["op"], "task": task})
+    return f"id: {change['revision']}\nevent: {change['op']}\ndata: {data}\n\n"
+
+
+SSE_HEARTBEAT = ": keep-alive\n\n"
+# no-cache: never replay a stream from a cache; X-Accel-Buffering: nginx (the frontend's
+# /api/ proxy) would otherwise buffer events until the response ends
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+
+# -------
+# Export
+# -------
+def parse_export_args(args) -> Tuple[str, str]:
+    fmt = (args.get("format") or "ndjson").lower()
+    if fmt not in EXPORT_FORMATS:
+        raise BadRequest("format must be ndjson or csv")
+    return fmt, (args.get("status") or "").strip()
+
+
+def _ndjson(chunk: List[dict]) -> str:
+    return "".join(json.dumps(task) + "\n" for task in chunk)
+
+
+def _csv(chunk: List[dict]) -> str:
+    buf = io.StringIO()
+    csv.DictWriter(buf, fieldnames=["id", "title", "status"]).writerows(chunk)
+    return buf.getvalue()
+
+
+# format -> (mimetype, header line, chunk encoder)
+EXPORT_FORMATS = {
+    "ndjson": ("application/x-ndjson", "", _ndjson),
+    "csv": ("text/csv", "id,title,status\r\n", _csv),
+}
+
+
+def export_headers(fmt: str) -> Dict[str, str]:
+    return {"Content-Disposition": f"attachment; filename=tasks.{fmt}"}
@@ -0,0 +1,5 @@
+import os
+import tempfile
+
+# common.py reads its config at import: point the apps at a throwaway SQLite file
+os.environ.setdefault("DATABASE_URL", f"sqlite+pysqlite:///{tempfile.mkdtemp()}/taskboard.db")
@@ -0,0 +1,174 @@
+# Versioned schema migrations for the task-board database.
+#
+# The API processes never run DDL. Run this once per deploy, before the new API version
+# starts: as a one-shot container (the "migrate" service in compose.yml) or a Kubernetes
+# init container on the API pod:
+#
+#   initContainers:
+#     - name: migrate
+#       image: taskboard-api:<tag>
+#       command: ["python", "migrate.py"]
+#       envFrom: [{configMapRef: {name: taskboard-config}}, {secretRef: {name: taskboard-secrets}}]
+#
+# as solutions/k8s/api-green.yaml does.
+#
+#   python migrate.py            # apply pending migrations
+#   python migrate.py --status   # list applied / pending versions
+#   python migrate.py --check    # exit 1 if anything is pending (e.g. a startup gate)
+#
+# Applied versions are recorded in schema_migrations. On Postgres a session advisory lock
+# serializes concurrent runners (several replicas' init containers starting at once), so
+# each migration is applied exactly once; the others wait, then find nothing to do. Each
+# migration and its schema_migrations row commit in one transaction. SQLite, the local
+# single-process fallback, takes no lock.
+#
+# Never edit a migration that has shipped; append a new version instead.
+from __future__ import annotations
+import argparse
+import sys
+import zlib
+from typing import Callable, List, Tuple, Union
+
+from sqlalchemy import create_engine, inspect, text
+from sqlalchemy.engine import Connection, Engine
+
+import common
+
+# Arbitrary but fixed: every runner must ask for the same lock
+LOCK_KEY = zlib.crc32(b"taskboard-schema-migrations")
+
+Statements = Union[str, Callable[[str], List[str]]]  # SQL, or dialect name -> SQL statements
+
+
+def _create_tasks(dialect: str) -> List[str]:
+    # SQLite (the local fallback) has no identity columns; AUTOINCREMENT gives the same never-reused ids
+    id_column = (
+        "id INTEGER PRIMARY KEY AUTOINCREMENT"
+        if dialect == "sqlite"
+        else "id INTEGER PRIMARY KEY GENERATED ALWAYS AS IDENTITY"
+    )
+    # IF NOT EXISTS adopts databases created by the old init_db() at import time
+    return [f"""
+CREATE TABLE IF NOT EXISTS tasks (
+    {id_column},
+    title TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'todo'
+)"""]
+
+
+def _create_task_changes(dialect: str) -> List[str]:
+    revision = (
+        "revision INTEGER PRIMARY KEY AUTOINCREMENT"
+        if dialect == "sqlite"
+        else "revision BIGINT PRIMARY KEY GENERATED ALWAYS AS IDENTITY"
+    )
+    return [
+        # SQLite can't ADD COLUMN with a non-constant default; the API sets it on every write
+        "ALTER TABLE tasks ADD COLUMN updated_at TIMESTAMP",
+        # Append-only log behind GET /tasks/changes: one row per created/updated/deleted task,
+        # numbered by revision so clients can resume with ?since=<revision>
+        f"""
+CREATE TABLE task_changes (
+    {revision},
+    task_id INTEGER NOT NULL,
+    op TEXT NOT NULL,
+    title TEXT,
+    status TEXT,
+    changed_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+)""",
+    ]
+
+
+MIGRATIONS: List[Tuple[int, str, Statements]] = [
+    (1, "create tasks", _create_tasks),
+    # Serves "WHERE status = ? AND id > ? ORDER BY id" without a sort (keyset pages per status)
+    (2, "index tasks (status, id)", "CREATE INDEX IF NOT EXISTS ix_tasks_status_id ON tasks (status, id)"),
+    (3, "tasks.updated_at and task_changes log", _create_task_changes),
+]
+
+CREATE_MIGRATIONS_TABLE = """
+CREATE TABLE IF NOT EXISTS schema_migrations (
+    version INTEGER PRIMARY KEY,
+    description TEXT NOT NULL,
+    applied_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+)"""
+
+
+def _statements(sql: Statements, dialect: str) -> List[str]:
+    if callable(sql):
+        return sql(dialect)
+    return [sql]
+
+
+def applied_versions(conn: Connection) -> List[int]:
+    """Read-only: an empty list when the migrations table doesn't exist yet."""
+    if not inspect(conn).has_table("schema_migrations"):
+        return []
+    return [v for (v,) in conn.execute(text("SELECT version FROM schema_migrations ORDER BY version"))]
+
+
+def pending(conn: Connection) -> List[Tuple[int, str, Statements]]:
+    done = set(applied_versions(conn))
+    return [m for m in MIGRATIONS if m[0] not in done]
+
+
+def _lock(conn: Connection, acquire: bool) -> None:
+    if conn.dialect.name != "postgresql":
+        return
+    fn = "pg_advisory_lock" if acquire else "pg_advisory_unlock"
+    conn.execute(text(f"SELECT {fn}(:key)"), {"key": LOCK_KEY})
+    conn.commit()  # session-level lock: outlives the transaction it was taken in
+
+
+def upgrade(engine: Engine, log: Callable[[str], None] = print) -> List[int]:
+    """Apply every pending migration in order; returns the versions applied."""
+    applied = []
+    with engine.connect() as conn:
+        _lock(conn, True)
+        try:
+            with conn.begin():
+                conn.execute(text(CREATE_MIGRATIONS_TABLE))
+                todo = pending(conn)
+            for version, description, sql in todo:
+                with conn.begin():
+                    for statement in _statements(sql, conn.dialect.name):
+                        conn.execute(text(statement))
+                    conn.execute(
+                        text("INSERT INTO schema_migrations (version, description) VALUES (:v, :d)"),
+                        {"v": version, "d": description},
+                    )
+                log(f"applied {version}: {description}")
+                applied.append(version)
+        finally:
+            _lock(conn, False)
+    return applied
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Apply task-board schema migrations")
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument("--status", action="store_true", help="list applied and pending migrations")
+    group.add_argument("--check", action="store_true", help="exit 1 if migrations are pending")
+    args = parser.parse_args()
+
+    engine = create_engine(common.DATABASE_URL, future=True)
+    try:
+        if args.status or args.check:
+            with engine.connect() as conn:
+                done = set(applied_versions(conn))
+            if args.check:
+                missing = [v for v, _, _ in MIGRATIONS if v not in done]
+                print(f"pending: {missing}" if missing else "up to date")
+                return 1 if missing else 0
+            for version, description, _ in MIGRATIONS:
+                print(f"{version:>4}  {'applied' if version in done else 'pending':<8} {description}")
+            return 0
+        applied = upgrade(engine)
+        print(f"schema at version {MIGRATIONS[-1][0]}" + ("" if applied else " (nothing to do)"))
+        return 0
+    finally:
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
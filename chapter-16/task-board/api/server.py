@@ -1,106 +1,283 @@
 from __future__ import annotations
-import os
-from dataclasses import dataclass
-from typing import List
+import threading
+import time
+from typing import Iterator, List
 
-from flask import Flask, jsonify, request
+from flask import Flask, Response, request
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
 from sqlalchemy import create_engine, text
-from sqlalchemy.exc import OperationalError
-
-# Config via env (works in Docker, docker-compose, Kubernetes)
-PORT = int(os.getenv("API_PORT", "8080"))
-LOG_LEVEL = os.getenv("API_LOG_LEVEL", "info")
-# Prefer DATABASE_URL (e.g., postgres://user:pass@db:5432/taskboard); fall back to SQLite for quick local runs
-DATABASE_URL = os.getenv("DATABASE_URL")
-if not DATABASE_URL:
-    db_host = os.getenv("DB_HOST")
-    db_name = os.getenv("DB_NAME", "taskboard")
-    db_user = os.getenv("DB_USER")
-    db_pass = os.getenv("DB_PASSWORD")
-    if db_host and db_user and db_pass:
-        DATABASE_URL = f"postgresql+psycopg://{db_user}:{db_pass}@{db_host}:5432/{db_name}"
-    else:
-        DATABASE_URL = f"sqlite+pysqlite:///./{db_name}.db"
+from sqlalchemy.pool import QueuePool
+
+import common
+from changes import ChangeFeed, Subscription, backlog, head
+from common import BadRequest, TaskNotFound
+
+# Config via env (works in Docker, docker-compose, Kubernetes); see common.py
+PORT = common.PORT
+LOG_LEVEL = common.LOG_LEVEL
+DATABASE_URL = common.DATABASE_URL
+CACHE = common.make_cache()
 
 app = Flask(__name__)
-engine = create_engine(DATABASE_URL, pool_pre_ping=True, future=True)
-
-INIT_SQL = """
-CREATE TABLE IF NOT EXISTS tasks (
-    id INTEGER PRIMARY KEY GENERATED ALWAYS AS IDENTITY,
-    title TEXT NOT NULL,
-    status TEXT NOT NULL DEFAULT 'todo'
-);
-"""
-
-# Initialize database on startup (Flask 3.0+ compatible)
-def init_db():
-    with engine.begin() as conn:
-        conn.execute(text(INIT_SQL))
+engine = create_engine(DATABASE_URL, future=True, **common.engine_options(common.TimedQueuePool))
+common.register_pool_metrics(engine.pool)
 
-# Initialize database when the module is loaded
-init_db()
+# The schema is created and upgraded by migrate.py (a one-shot job before the API starts);
+# workers never run DDL.
 
-@app.get("/health")
-def health():
+DB_HEALTH = common.DBHealth()
+health_engine = create_engine(DATABASE_URL, future=True, **common.health_engine_options(QueuePool))
+
+def _check_db():
+    t0 = time.perf_counter()
     try:
-        with engine.connect() as conn:
+        with health_engine.connect() as conn:
             conn.execute(text("SELECT 1"))
-        return {"status": "ok", "version": "1.1.0"}, 200
-    except OperationalError:
-        return {"status": "degraded", "version": "1.1.0"}, 503
+        DB_HEALTH.record(True, latency=time.perf_counter() - t0)
+    except Exception as err:  # not just SQLAlchemyError: any escape would end the checker
+        DB_HEALTH.record(False, error=type(err).__name__)
+
+def _check_db_forever():
+    while True:
+        _check_db()
+        time.sleep(DB_HEALTH.interval)
+
+threading.Thread(target=_check_db_forever, name="db-health", daemon=True).start()
+
+FEED = ChangeFeed(engine)
+# Open GET /tasks/changes streams in this process; see common.CHANGES_MAX_STREAMS
+STREAM_SLOTS = threading.BoundedSemaphore(common.CHANGES_MAX_STREAMS) if common.CHANGES_MAX_STREAMS > 0 else None
+
+def _changed():
+    """After a write commits: drop cached reads, wake this process's change streams."""
+    CACHE.invalidate()
+    FEED.wake()
+
+@app.errorhandler(BadRequest)
+def bad_request(err: BadRequest):
+    return {"error": str(err)}, 400
+
+@app.get("/livez")
+def livez():
+    # Liveness: the process answers HTTP. Deliberately no DB check, so a database outage
+    # doesn't get every replica restarted.
+    return {"status": "ok"}, 200
+
+@app.get("/readyz")
+def readyz():
+    # Readiness: the cached background DB check plus pool saturation; never touches the pool
+    return DB_HEALTH.readiness(engine.pool)
+
+@app.get("/health")
+def health():
+    # Kept for existing probes and dashboards: the cached DB check only. Unlike /readyz it
+    # ignores pool saturation, since older manifests use it as their liveness probe.
+    return DB_HEALTH.readiness(engine.pool, check_pool=False)
+
+@app.get("/metrics")
+def metrics():
+    return generate_latest(), 200, {"Content-Type": CONTENT_TYPE_LATEST}
+
+def _cached(key, build):
+    """Serve a cached GET with its ETag (and Link); 304 when If-None-Match already matches."""
+    body, etag, link = CACHE.get(key, build)
+    if request.if_none_match.contains_weak(etag):
+        response = Response(status=304)
+    else:
+        response = Response(body, mimetype="application/json")
+    response.set_etag(etag)
+    # Let browsers keep the body but revalidate on every poll
+    response.headers["Cache-Control"] = "no-cache"
+    if link:
+        response.headers["Link"] = link
+    return response
 
 @app.get("/tasks")
 def list_tasks():
-    with engine.connect() as conn:
-        rows = conn.execute(text("SELECT id, title, status FROM tasks ORDER BY id")).mappings().all()
-        return jsonify([dict(r) for r in rows])
+    # Keyset pagination: ?after_id=<last id seen>&limit=<n>, optionally &status=<status>.
+    # Pages seek on the primary key (or the (status, id) index) instead of OFFSET, so each
+    # page costs the same however deep it is. The next page is announced in a Link header.
+    after_id, limit, status = common.parse_page_args(request.args)
+
+    def build():
+        with engine.connect() as conn:
+            rows = conn.execute(
+                common.select_page(status), common.page_params(after_id, limit, status)
+            ).mappings().all()
+        return common.page_result(rows, limit, status)
+
+    return _cached(("list", after_id, limit, status), build)
+
+@app.get("/tasks/<int:task_id>")
+def get_task(task_id: int):
+    def build():
+        with engine.connect() as conn:
+            row = conn.execute(common.SELECT_ONE, {"id": task_id}).mappings().first()
+        if not row:
+            raise TaskNotFound(task_id)  # not cached: the id may be created later
+        return dict(row), None
+
+    try:
+        return _cached(("task", task_id), build)
+    except TaskNotFound:
+        return {"error": "not found"}, 404
+
+def _export_chunks(status: str) -> Iterator[List[dict]]:
+    """All tasks (optionally one status) in id order, EXPORT_CHUNK_SIZE rows at a time."""
+    if engine.dialect.name == "postgresql":
+        # Server-side cursor: Postgres sends rows as we ask for them instead of all at once
+        with engine.connect() as conn:
+            result = conn.execution_options(
+                stream_results=True, yield_per=common.EXPORT_CHUNK_SIZE
+            ).execute(common.select_all(status), {"status": status})
+            for partition in result.mappings().partitions():
+                yield [dict(r) for r in partition]
+        return
+    # SQLite: short keyset queries, so no read transaction stays open while the client downloads
+    after_id = 0
+    while True:
+        with engine.connect() as conn:
+            rows = conn.execute(
+                common.select_page(status),
+                {"after_id": after_id, "status": status, "limit": common.EXPORT_CHUNK_SIZE},
+            ).mappings().all()
+        if not rows:
+            return
+        yield [dict(r) for r in rows]
+        after_id = rows[-1]["id"]
+
+@app.get("/tasks/export")
+def export_tasks():
+    # Streams every task as NDJSON (default) or CSV (?format=csv); memory stays at one chunk
+    fmt, status = common.parse_export_args(request.args)
+    mimetype, header, encode = common.EXPORT_FORMATS[fmt]
+
+    def lines():
+        yield header
+        for chunk in _export_chunks(status):
+            yield encode(chunk)
+
+    return Response(lines(), mimetype=mimetype, headers=common.export_headers(fmt))
+
+@app.get("/tasks/changes")
+def task_changes():
+    # Server-sent events: one "create", "update" or "delete" event per changed task, with the
+    # revision as the event id. ?since=<revision> (or Last-Event-ID on reconnect) replays what
+    # was missed first. Each open stream holds a worker thread (run gthread workers), so at
+    # most CHANGES_MAX_STREAMS are served at once; beyond that the client gets a 503.
+    since = common.parse_since(request.args, request.headers)
+    if STREAM_SLOTS and not STREAM_SLOTS.acquire(blocking=False):
+        return ({"error": "too many open change streams"}, 503,
+                {"Retry-After": str(common.CHANGES_RETRY_AFTER)})
+
+    def events():
+        sub = Subscription()
+        try:
+            FEED.subscribe(sub)  # before the replay, so nothing committed in between is missed
+            last = since
+            if last is None:
+                with engine.connect() as conn:
+                    last = head(conn)
+            # Sends the headers now: once the client sees the stream open, it is subscribed
+            yield common.SSE_HEARTBEAT
+            while True:  # replay, in short reads so no transaction stays open
+                with engine.connect() as conn:
+                    batch = backlog(conn, last)
+                if not batch:
+                    break
+                for change in batch:
+                    yield common.sse_event(change)
+                last = batch[-1]["revision"]
+            while not sub.dropped or not sub.queue.empty():
+                batch = sub.get(common.CHANGES_HEARTBEAT)
+                if batch is None:
+                    yield common.SSE_HEARTBEAT
+                    continue
+                for change in batch:
+                    if change["revision"] > last:  # already sent during the replay
+                        yield common.sse_event(change)
+                        last = change["revision"]
+        finally:
+            FEED.unsubscribe(sub)
+
+    response = Response(events(), mimetype="text/event-stream", headers=common.SSE_HEADERS)
+    if STREAM_SLOTS:
+        # Runs when the server closes the response, even if the generator never started
+        response.call_on_close(STREAM_SLOTS.release)
+    return response
 
 @app.post("/tasks")
 def create_task():
-    data = request.get_json(silent=True) or {}
-    title = (data.get("title") or "").strip()
-    if not title:
-        return {"error": "title is required"}, 400
-    status = (data.get("status") or "todo").strip()
+    title, status = common.parse_new_task(request.get_json(silent=True))
     with engine.begin() as conn:
-        row = conn.execute(
-            text("INSERT INTO tasks (title, status) VALUES (:t, :s) RETURNING id, title, status"),
-            {"t": title, "s": status},
-        ).mappings().first()
-        return dict(row), 201
+        row = conn.execute(common.INSERT, {"title": title, "status": status}).mappings().first()
+        common.record_changes(conn, "create", [row])
+    _changed()
+    return dict(row), 201
+
+@app.post("/tasks/bulk")
+def create_tasks_bulk():
+    # [{"title": ..., "status": ...}, ...] -> all created in one transaction, or none (400)
+    rows = common.parse_bulk_create(request.get_json(silent=True))
+    with engine.begin() as conn:
+        result = conn.execute(common.INSERT, common.insert_rows(rows)).mappings().all()
+        created = sorted((dict(r) for r in result), key=lambda r: r["id"])
+        common.record_changes(conn, "create", created)
+    _changed()
+    return {"created": created}, 201
+
+@app.patch("/tasks/bulk")
+def update_tasks_bulk():
+    # [{"id": 1, "status": "done"}, {"id": 2, "title": "..."}, ...] -> one transaction;
+    # fields left out keep their value, unknown ids are listed in "notFound"
+    rows = common.parse_bulk_update(request.get_json(silent=True))
+    updated = []
+    with engine.begin() as conn:
+        for chunk in common.chunks(list(rows.values())):
+            updated.extend(dict(r) for r in conn.execute(*common.update_many(chunk)).mappings())
+        updated.sort(key=lambda r: r["id"])
+        common.record_changes(conn, "update", updated)
+    _changed()
+    found = {r["id"] for r in updated}
+    return {"updated": updated, "notFound": [i for i in rows if i not in found]}, 200
+
+@app.delete("/tasks/bulk")
+def delete_tasks_bulk():
+    # [1, 2, 3] -> deleted in one transaction; unknown ids are listed in "notFound"
+    ids = common.parse_bulk_delete(request.get_json(silent=True))
+    deleted = set()
+    with engine.begin() as conn:
+        for chunk in common.chunks(ids):
+            deleted.update(conn.execute(common.DELETE_MANY, {"ids": chunk}).scalars())
+        common.record_changes(conn, "delete", [{"id": i} for i in ids if i in deleted])
+    _changed()
+    return {"deleted": len(deleted), "notFound": [i for i in ids if i not in deleted]}, 200
 
 @app.patch("/tasks/<int:task_id>")
 def update_task(task_id: int):
-    data = request.get_json(silent=True) or {}
-    fields = {}
-    if "title" in data:
-        fields["title"] = (data["title"] or "").strip()
-    if "status" in data:
-        fields["status"] = (data["status"] or "").strip()
-    if not fields:
-        return {"error": "no fields to update"}, 400
-    set_clause = ", ".join([f"{k} = :{k}" for k in fields])
-    fields["id"] = task_id
+    fields = common.parse_changes(request.get_json(silent=True))
     with engine.begin() as conn:
         result = conn.execute(
-            text(f"UPDATE tasks SET {set_clause} WHERE id = :id RETURNING id, title, status"),
-            fields,
+            common.UPDATE_ONE, common.update_params(task_id, fields)
         ).mappings().first()
         if not result:
             return {"error": "not found"}, 404
-        return dict(result), 200
+        common.record_changes(conn, "update", [result])
+    _changed()
+    return dict(result), 200
 
 @app.delete("/tasks/<int:task_id>")
 def delete_task(task_id: int):
     with engine.begin() as conn:
-        result = conn.execute(
-            text("DELETE FROM tasks WHERE id = :id RETURNING id"),
-            {"id": task_id},
-        ).first()
+        result = conn.execute(common.DELETE_ONE, {"id": task_id}).first()
         if not result:
             return {"error": "not found"}, 404
-        return {"status": "deleted"}, 200
+        common.record_changes(conn, "delete", [{"id": task_id}])
+    _changed()
+    return {"status": "deleted"}, 200
 
 if __name__ == "__main__":
-    app.run(host="0.0.0.0", port=PORT)
\ No newline at end of file
+    # Local runs (python server.py) bring the schema up to date first, like the compose stack's migrate job
+    import migrate
+    migrate.upgrade(engine)
+    app.run(host="0.0.0.0", port=PORT)
@@ -0,0 +1,54 @@
+# GET /tasks/changes on the sync server: open streams are capped per process
+import threading
+
+import pytest
+
+
+def test_streams_beyond_the_cap_get_503(monkeypatch):
+    import migrate
+    import server
+
+    migrate.upgrade(server.engine)
+    monkeypatch.setattr(server, "STREAM_SLOTS", threading.BoundedSemaphore(1))
+    client = server.app.test_client()
+    first = client.get("/tasks/changes", buffered=False)
+    assert first.status_code == 200
+    assert next(first.response) == b": keep-alive\n\n"
+
+    refused = client.get("/tasks/changes")
+    assert refused.status_code == 503
+    assert refused.headers["Retry-After"] == "5"
+
+    first.close()  # frees the slot
+    second = client.get("/tasks/changes", buffered=False)
+    assert second.status_code == 200
+    second.close()
+
+
+class _Unreachable:
+    dialect = None
+
+    def connect(self):
+        raise ConnectionRefusedError("db:5432")
+
+
+def test_feed_retries_start_after_a_failed_subscribe(monkeypatch):
+    import migrate
+    import server
+    from changes import ChangeFeed, Subscription
+
+    migrate.upgrade(server.engine)
+    feed = ChangeFeed(_Unreachable())
+    monkeypatch.setattr(server, "FEED", feed)
+    client = server.app.test_client()
+    with pytest.raises(ConnectionRefusedError):
+        client.get("/tasks/changes")
+    assert not feed._started
+    assert not feed._subscribers  # the failed stream unsubscribed
+
+    feed.engine = server.engine  # the database is back
+    sub = Subscription()
+    feed.subscribe(sub)
+    assert feed._started
+    feed.unsubscribe(sub)
+    feed.stop()
@@ -0,0 +1,40 @@
+# Request validation in common.py; run with `python -m pytest` from this directory
+import pytest
+
+import common
+from common import BadRequest
+
+
+@pytest.mark.parametrize("item", [{"title": 5}, {"title": ["a"]}, {"title": "a", "status": 1}])
+def test_new_task_rejects_non_string_fields(item):
+    with pytest.raises(BadRequest, match="must be a string"):
+        common.parse_new_task(item)
+
+
+def test_new_task_defaults_status():
+    assert common.parse_new_task({"title": " write ", "status": None}) == ("write", "todo")
+
+
+@pytest.mark.parametrize("item", [{"title": {}}, {"status": 2}, {"status": True}])
+def test_changes_reject_non_string_fields(item):
+    with pytest.raises(BadRequest, match="must be a string"):
+        common.parse_changes(item)
+
+
+def test_bulk_create_names_the_bad_item():
+    with pytest.raises(BadRequest, match="item 1: title must be a string"):
+        common.parse_bulk_create([{"title": "ok"}, {"title": 7}])
+
+
+def test_bulk_update_names_the_bad_item():
+    with pytest.raises(BadRequest, match="item 2: status must be a string"):
+        common.parse_bulk_update([{"id": 1, "status": "done"}, {"id": 2, "title": "x"}, {"id": 3, "status": 4}])
+
+
+def test_bulk_update_keeps_valid_changes():
+    assert common.parse_bulk_update([{"id": 1, "status": " done "}]) == {1: (1, None, "done")}
+
+
+def test_page_args_reject_non_integers():
+    with pytest.raises(BadRequest, match="after_id must be an integer"):
+        common.parse_page_args({"after_id": "abc"})
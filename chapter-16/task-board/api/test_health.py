@@ -0,0 +1,46 @@
+# The background DB checkers must survive any error from the driver, not just SQLAlchemy's
+import asyncio
+
+import pytest
+
+
+class _Unreachable:
+    def connect(self):
+        raise ConnectionRefusedError("db:5432")
+
+
+def test_sync_checker_records_driver_errors(monkeypatch):
+    import server
+
+    monkeypatch.setattr(server, "health_engine", _Unreachable())
+    server._check_db()  # must not raise
+    body, status = server.DB_HEALTH.readiness(server.engine.pool)
+    assert status == 503
+    assert body["db"]["error"] == "ConnectionRefusedError"
+
+
+def test_async_checker_keeps_looping(monkeypatch):
+    async_server = pytest.importorskip("async_server")
+    monkeypatch.setattr(async_server, "health_engine", _Unreachable())
+    monkeypatch.setattr(async_server.DB_HEALTH, "interval", 0.01)
+
+    async def run():
+        checker = asyncio.create_task(async_server._check_db_forever())
+        await asyncio.sleep(0.1)
+        assert not checker.done()  # an escaped exception would have ended the task
+        checker.cancel()
+
+    asyncio.run(run())
+    assert async_server.DB_HEALTH.error == "ConnectionRefusedError"
+
+
+def test_saturated_pool_fails_readiness_not_health(monkeypatch):
+    import common
+    import server
+
+    monkeypatch.setattr(common, "pool_saturated", lambda pool: True)
+    monkeypatch.setattr(server, "_check_db", lambda: None)
+    server.DB_HEALTH.record(True, latency=0.001)
+    client = server.app.test_client()
+    assert client.get("/readyz").status_code == 503
+    assert client.get("/health").status_code == 200
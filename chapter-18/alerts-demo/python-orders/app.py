@@ -1,6 +1,8 @@
-from flask import Flask, request, jsonify
-import requests
+from flask import Flask, g, request, jsonify
 import os
+import time
+
+import payments  # pooled keep-alive client for payments-service
 
 # --- OpenTelemetry imports
 from opentelemetry import trace
@@ -22,34 +24,20 @@ from opentelemetry.exporter.otlp.proto.http.trace_exporter import (
     OTLPSpanExporter,
 )
 
-# --- Metrics
+# --- Metrics (metric objects live in metrics.py)
 from prometheus_client import (
-    Counter,
-    Histogram,
     generate_latest,
     CONTENT_TYPE_LATEST,
 )
 
+from metrics import REGISTRY, RedMetrics
+
 SERVICE = os.getenv("SERVICE_NAME", "orders-service")
 OTEL_ENDPOINT = os.getenv(
     "OTEL_EXPORTER_OTLP_ENDPOINT",
     "http://otel-collector:4318",
 )
 
-# --- Prometheus metric objects
-REQS = Counter(
-    "orders_requests_total",
-    "Total /order requests",
-)
-ERRS = Counter(
-    "orders_errors_total",
-    "Total /order errors",
-)
-LAT = Histogram(
-    "orders_request_seconds",
-    "Latency of /order",
-)
-
 # --- OTel tracer
 trace.set_tracer_provider(
     TracerProvider(
@@ -70,26 +58,42 @@ FlaskInstrumentor().instrument_app(app)
 RequestsInstrumentor().instrument()
 
 
+# --- RED metrics for every route (see metrics.py)
+@app.before_request
+def start_timer():
+    g.start = time.perf_counter()
+
+
+@app.after_request
+def record_request(response):
+    rule = request.url_rule
+    RED.observe(
+        rule.rule if rule else None,
+        response.status_code,
+        time.perf_counter() - g.start,
+        failed=g.get("failed", False),
+    )
+    return response
+
+
 @app.route("/order", methods=["POST"])
-@LAT.time()  # measure latency of handler
 def order():
-    REQS.inc()
     payload = request.get_json(
         force=True,
         silent=True,
     ) or {}
 
     try:
-        resp = requests.get(
-            "http://payments-service:8080/pay",
-            timeout=2,
-        )
+        resp = payments.pay()
         pay_status = {
             "payments_status": resp.text,
             "payments_code": resp.status_code,
         }
+        # The order still answers 200; a 5xx from payments is a failed order
+        if resp.status_code >= 500:
+            g.failed = True
     except Exception as ex:
-        ERRS.inc()
+        g.failed = True  # counted in orders_errors_total
         pay_status = {
             "payments_status": f"error: {ex}",
             "payments_code": 500,
@@ -107,7 +111,7 @@ def order():
 
 @app.route("/metrics")
 def metrics():
-    data = generate_latest()
+    data = generate_latest(REGISTRY)
     return data, 200, {
         "Content-Type": CONTENT_TYPE_LATEST
     }
@@ -118,5 +122,9 @@ def health():
     return "ok"
 
 
+# After every route is registered
+RED = RedMetrics(rule.rule for rule in app.url_map.iter_rules())
+
+
 if __name__ == "__main__":
     app.run(host="0.0.0.0", port=8080)
\ No newline at end of file
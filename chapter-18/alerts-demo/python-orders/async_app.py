@@ -0,0 +1,190 @@
+"""Asyncio variant of the orders service: Quart (Flask's asyncio twin)
+on uvicorn, with aiohttp for the downstream calls. Same routes, metrics
+and tracing as app.py. An order waiting on its downstreams parks a
+coroutine instead of holding a worker thread, and the downstreams are
+called concurrently, so an order takes as long as the slowest one, not
+the sum.
+
+  uvicorn async_app:app --host 0.0.0.0 --port 8080
+"""
+
+from quart import Quart, g, request, jsonify
+import asyncio
+import os
+import time
+
+import aiohttp
+
+import payments  # same config, circuit breaker and retry budget as app.py
+
+# --- OpenTelemetry imports
+from opentelemetry import trace
+from opentelemetry.instrumentation.aiohttp_client import (
+    AioHttpClientInstrumentor,
+)
+from opentelemetry.instrumentation.asgi import (
+    OpenTelemetryMiddleware,
+)
+from opentelemetry.sdk.resources import (
+    SERVICE_NAME,
+    Resource,
+)
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import (
+    BatchSpanProcessor,
+)
+from opentelemetry.exporter.otlp.proto.http.trace_exporter import (
+    OTLPSpanExporter,
+)
+
+# --- Metrics (metric objects live in metrics.py)
+from prometheus_client import (
+    generate_latest,
+    CONTENT_TYPE_LATEST,
+)
+
+from metrics import REGISTRY, RedMetrics
+
+SERVICE = os.getenv("SERVICE_NAME", "orders-service")
+OTEL_ENDPOINT = os.getenv(
+    "OTEL_EXPORTER_OTLP_ENDPOINT",
+    "http://otel-collector:4318",
+)
+
+# --- Downstreams
+# Called concurrently with payments for every order; unset = skipped
+DOWNSTREAMS = {
+    name: url
+    for name, url in (
+        ("inventory", os.getenv("INVENTORY_URL", "")),
+        ("pricing", os.getenv("PRICING_URL", "")),
+    )
+    if url
+}
+# One keep-alive pool for all downstreams: total and per-host limits
+POOL_SIZE = int(os.getenv("DOWNSTREAM_POOL_SIZE", "200"))
+POOL_PER_HOST = int(os.getenv("DOWNSTREAM_POOL_PER_HOST", "100"))
+
+# --- OTel tracer
+trace.set_tracer_provider(
+    TracerProvider(
+        resource=Resource.create({SERVICE_NAME: SERVICE})
+    )
+)
+tracer_provider = trace.get_tracer_provider()
+tracer_provider.add_span_processor(
+    BatchSpanProcessor(
+        OTLPSpanExporter(
+            endpoint=f"{OTEL_ENDPOINT}/v1/traces"
+        )
+    )
+)
+
+app = Quart(__name__)
+app.asgi_app = OpenTelemetryMiddleware(app.asgi_app)
+AioHttpClientInstrumentor().instrument()
+
+
+@app.before_serving
+async def open_http():
+    # The session (and its pool) must be created on the serving loop
+    app.http = aiohttp.ClientSession(
+        connector=aiohttp.TCPConnector(
+            limit=POOL_SIZE,
+            limit_per_host=POOL_PER_HOST,
+        ),
+        timeout=aiohttp.ClientTimeout(
+            sock_connect=payments.PAYMENTS_TIMEOUT,
+            sock_read=payments.PAYMENTS_TIMEOUT,
+        ),
+    )
+
+
+@app.after_serving
+async def close_http():
+    await app.http.close()
+
+
+# --- RED metrics for every route (see metrics.py)
+@app.before_request
+async def start_timer():
+    g.start = time.perf_counter()
+
+
+@app.after_request
+async def record_request(response):
+    rule = request.url_rule
+    RED.observe(
+        rule.rule if rule else None,
+        response.status_code,
+        time.perf_counter() - g.start,
+        failed=g.get("failed", False),
+    )
+    return response
+
+
+async def _get(url):
+    async with app.http.get(url) as resp:
+        return resp.status, await resp.text()
+
+
+@app.route("/order", methods=["POST"])
+async def order():
+    payload = await request.get_json(
+        force=True,
+        silent=True,
+    ) or {}
+
+    calls = {"payments": payments.pay_async(app.http)}
+    calls.update({name: _get(url) for name, url in DOWNSTREAMS.items()})
+    results = await asyncio.gather(
+        *calls.values(),
+        return_exceptions=True,
+    )
+
+    downstream = {}
+    for name, result in zip(calls, results):
+        if isinstance(result, Exception):
+            g.failed = True  # counted in orders_errors_total
+            # str() of a timeout is empty: fall back to the type name
+            error = str(result) or type(result).__name__
+            downstream[f"{name}_status"] = f"error: {error}"
+            downstream[f"{name}_code"] = 500
+        else:
+            code, text = result
+            if code >= 500:  # the order still answers 200
+                g.failed = True
+            downstream[f"{name}_status"] = text
+            downstream[f"{name}_code"] = code
+
+    return jsonify(
+        {
+            "service": SERVICE,
+            "message": "Order received",
+            "payload": payload,
+            "downstream": downstream,
+        }
+    )
+
+
+@app.route("/metrics")
+async def metrics():
+    data = generate_latest(REGISTRY)
+    return data, 200, {
+        "Content-Type": CONTENT_TYPE_LATEST
+    }
+
+
+@app.route("/healthz")
+async def health():
+    return "ok"
+
+
+# After every route is registered
+RED = RedMetrics(rule.rule for rule in app.url_map.iter_rules())
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    uvicorn.run(app, host="0.0.0.0", port=8080)
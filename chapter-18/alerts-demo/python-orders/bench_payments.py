@@ -0,0 +1,84 @@
+"""Benchmark: the payments call as /order makes it, per-request
+requests.get() (the old code: a new TCP connection every time) vs the
+pooled keep-alive client in payments.py, against a local stub.
+
+Reports p50/p99 latency of the call, calls/sec and how many TCP
+connections the stub accepted.
+
+  python bench_payments.py --threads 16 --calls 200 --delay 5
+"""
+
+import argparse
+import os
+import threading
+import time
+
+import requests
+
+import stub_payments
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+def run(call, threads, calls):
+    latencies = []
+    lock = threading.Lock()
+
+    def worker():
+        mine = []
+        for _ in range(calls):
+            t0 = time.perf_counter()
+            call().raise_for_status()
+            mine.append(time.perf_counter() - t0)
+        with lock:
+            latencies.extend(mine)
+
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    t0 = time.perf_counter()
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    return latencies, time.perf_counter() - t0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--calls", type=int, default=200, help="per thread")
+    parser.add_argument("--delay", type=float, default=5, help="stub ms per request")
+    parser.add_argument("--port", type=int, default=8090, help="stub port")
+    args = parser.parse_args()
+
+    stub = stub_payments.spawn(args.port, args.delay)
+    base = f"http://127.0.0.1:{args.port}"
+    url = f"{base}/pay"
+    os.environ["PAYMENTS_URL"] = url
+    import payments  # reads PAYMENTS_URL at import
+
+    def connections():
+        return int(requests.get(f"{base}/_connections", timeout=2).text)
+
+    cases = [
+        ("per-request", lambda: requests.get(url, timeout=2)),
+        ("pooled", payments.pay),
+    ]
+    print(f"{args.threads} threads x {args.calls} calls, stub delay {args.delay} ms")
+    print(f"{'client':<13}{'calls/s':>9}{'p50 ms':>9}{'p99 ms':>9}{'conns':>7}")
+    for name, call in cases:
+        before = connections()
+        latencies, elapsed = run(call, args.threads, args.calls)
+        print(
+            f"{name:<13}{len(latencies) / elapsed:>9,.0f}"
+            f"{percentile(latencies, 50) * 1000:>9.2f}"
+            f"{percentile(latencies, 99) * 1000:>9.2f}"
+            f"{connections() - before - 1:>7}"
+        )
+    stub.terminate()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+"""Load test: the sync orders app (app.py under gunicorn gthread) vs the
+asyncio one (async_app.py under uvicorn), one worker process each,
+against local stub downstreams (stub_payments.py). Holds --connections
+concurrent keep-alive clients on POST /order for --duration seconds and
+reports orders/sec and p50/p99 latency.
+
+Runs three cases: both apps calling payments only, then the async app
+fanning out to payments, inventory and pricing concurrently.
+
+  pip install gunicorn   # for the sync case
+  python loadtest_orders.py --connections 200 --duration 10 --delay 50
+
+Tracing is switched off (OTEL_SDK_DISABLED) so no collector is needed.
+"""
+
+import argparse
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import time
+
+import aiohttp
+
+import stub_payments
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def server_cmd(kind, port, threads):
+    if kind == "sync":
+        return [
+            sys.executable, "-m", "gunicorn", "-w", "1",
+            "-k", "gthread", "--threads", str(threads),
+            "-b", f"127.0.0.1:{port}", "--log-level", "warning",
+            "app:app",
+        ]
+    return [
+        sys.executable, "-m", "uvicorn", "async_app:app",
+        "--host", "127.0.0.1", "--port", str(port),
+        "--log-level", "warning", "--no-access-log",
+    ]
+
+
+def wait_for_port(port, timeout=20.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        with socket.socket() as s:
+            if s.connect_ex(("127.0.0.1", port)) == 0:
+                return
+        time.sleep(0.1)
+    raise RuntimeError(f"server on port {port} did not start")
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return float("nan")
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * pct / 100))]
+
+
+async def drive(url, connections, duration):
+    latencies = []
+    errors = 0
+    connector = aiohttp.TCPConnector(limit=connections)
+    timeout = aiohttp.ClientTimeout(total=30)
+    async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+        stop = time.monotonic() + duration
+
+        async def client():
+            nonlocal errors
+            while time.monotonic() < stop:
+                t0 = time.perf_counter()
+                try:
+                    async with session.post(url, json={"item": "book"}) as resp:
+                        body = await resp.json()
+                    if resp.status != 200 or any(
+                        code != 200
+                        for key, code in body["downstream"].items()
+                        if key.endswith("_code")
+                    ):
+                        errors += 1
+                        continue
+                except (aiohttp.ClientError, asyncio.TimeoutError):
+                    errors += 1
+                    continue
+                latencies.append(time.perf_counter() - t0)
+
+        t0 = time.monotonic()
+        await asyncio.gather(*(client() for _ in range(connections)))
+        elapsed = time.monotonic() - t0
+    return latencies, errors, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the sync vs async orders apps")
+    parser.add_argument("--connections", type=int, default=200)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--delay", type=float, default=50, help="stub ms per downstream call")
+    parser.add_argument("--threads", type=int, default=16, help="gthread threads for the sync app")
+    parser.add_argument("--port", type=int, default=8090, help="first of 4 ports (3 stubs + app)")
+    args = parser.parse_args()
+
+    stub_ports = [args.port, args.port + 1, args.port + 2]
+    app_port = args.port + 3
+    stubs = [stub_payments.spawn(port, args.delay) for port in stub_ports]
+    base_env = dict(
+        os.environ,
+        OTEL_SDK_DISABLED="true",
+        PAYMENTS_URL=f"http://127.0.0.1:{stub_ports[0]}/pay",
+        # keep the pool from being the bottleneck in either app
+        PAYMENTS_POOL_SIZE=str(max(args.threads, args.connections)),
+    )
+    fanout = {
+        "INVENTORY_URL": f"http://127.0.0.1:{stub_ports[1]}/stock",
+        "PRICING_URL": f"http://127.0.0.1:{stub_ports[2]}/price",
+    }
+    cases = [
+        ("sync", "sync", {}),
+        ("async", "async", {}),
+        ("async x3", "async", fanout),
+    ]
+
+    print(f"{args.connections} connections, {args.duration:.0f} s, downstream delay {args.delay:.0f} ms")
+    print(f"{'app':<10}{'orders/s':>10}{'p50 ms':>10}{'p99 ms':>10}{'errors':>8}")
+    try:
+        for name, kind, extra in cases:
+            proc = subprocess.Popen(
+                server_cmd(kind, app_port, args.threads),
+                cwd=HERE,
+                env=dict(base_env, **extra),
+            )
+            try:
+                wait_for_port(app_port)
+                latencies, errors, elapsed = asyncio.run(
+                    drive(f"http://127.0.0.1:{app_port}/order", args.connections, args.duration)
+                )
+            finally:
+                proc.terminate()
+                proc.wait()
+            latencies.sort()
+            print(
+                f"{name:<10}{len(latencies) / elapsed:>10,.0f}"
+                f"{percentile(latencies, 50) * 1000:>10.1f}"
+                f"{percentile(latencies, 99) * 1000:>10.1f}"
+                f"{errors:>8}"
+            )
+    finally:
+        for stub in stubs:
+            stub.terminate()
+
+
+if __name__ == "__main__":
+    main()
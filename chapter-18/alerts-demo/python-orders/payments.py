@@ -0,0 +1,188 @@
+"""Client for the orders -> payments-service call.
+
+One connection pool per process, shared by every request thread:
+connections to payments-service stay open (HTTP keep-alive) and are
+reused, instead of a new TCP connection (and handshake, and ephemeral
+port) for every order.
+
+requests.Session is not documented as thread-safe, so each thread gets
+its own Session, but all of them mount the same HTTPAdapter, which is
+where the (thread-safe) urllib3 connection pool lives.
+
+pay() goes through resilience.Resilient: a circuit breaker, retries
+within a budget, and optional hedging (see resilience.py). Every
+attempt for one order carries the same Idempotency-Key header, so
+payments-service can tell a retry or hedge from a second payment.
+Attach metrics with instrument().
+
+pay_async(session) is the same call for the asyncio app, on the
+caller's aiohttp session: its connector is the pool there, and its
+timeout should match PAYMENTS_TIMEOUT. It shares the circuit breaker
+and retry budget with pay().
+"""
+
+import os
+import threading
+import time
+import uuid
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from resilience import (
+    AsyncResilient,
+    CircuitBreaker,
+    LatencyTracker,
+    Resilient,
+    RetryBudget,
+)
+
+PAYMENTS_URL = os.getenv(
+    "PAYMENTS_URL",
+    "http://payments-service:8080/pay",
+)
+# Seconds to connect, and to wait for each read
+PAYMENTS_TIMEOUT = float(os.getenv("PAYMENTS_TIMEOUT", "2"))
+
+# --- Pool config
+# Hosts to keep a pool for (we only call payments-service)
+POOL_HOSTS = int(os.getenv("PAYMENTS_POOL_HOSTS", "4"))
+# Keep-alive connections kept open per host
+POOL_SIZE = int(os.getenv("PAYMENTS_POOL_SIZE", "20"))
+# true: POOL_SIZE is a hard per-host limit, extra callers wait for a
+# free connection (each is back within PAYMENTS_TIMEOUT).
+# false: open extra connections and close them after use.
+POOL_BLOCK = os.getenv("PAYMENTS_POOL_BLOCK", "true").lower() == "true"
+
+ADAPTER = HTTPAdapter(
+    pool_connections=POOL_HOSTS,
+    pool_maxsize=POOL_SIZE,
+    pool_block=POOL_BLOCK,
+)
+
+# --- Resilience config
+# Consecutive failures that open the circuit, and seconds before probing
+BREAKER_FAILURES = int(os.getenv("PAYMENTS_BREAKER_FAILURES", "5"))
+BREAKER_RESET = float(os.getenv("PAYMENTS_BREAKER_RESET", "10"))
+# Attempts per order (1 = no retries); retries back off from
+# RETRY_BACKOFF seconds with full jitter and never start after
+# RETRY_DEADLINE, so a call that timed out is not retried
+RETRY_ATTEMPTS = int(os.getenv("PAYMENTS_RETRY_ATTEMPTS", "2"))
+RETRY_BACKOFF = float(os.getenv("PAYMENTS_RETRY_BACKOFF", "0.05"))
+RETRY_DEADLINE = float(os.getenv("PAYMENTS_RETRY_DEADLINE", str(PAYMENTS_TIMEOUT)))
+# Retries + hedges may add at most this fraction of extra calls
+RETRY_BUDGET = float(os.getenv("PAYMENTS_RETRY_BUDGET", "0.2"))
+# Send a second request when the first is slower than this percentile
+HEDGE = os.getenv("PAYMENTS_HEDGE", "false").lower() == "true"
+HEDGE_PERCENTILE = float(os.getenv("PAYMENTS_HEDGE_PERCENTILE", "95"))
+# Once hedging has a delay, every attempt runs on its thread pool: size
+# it for each request thread's attempt and hedge, plus losing attempts
+# still finishing. Too small, and attempts queue there, the wait counts
+# against the hedge delay and sets off more hedges. Threads start on
+# demand, so a generous cap costs nothing while idle.
+REQUEST_THREADS = int(os.getenv("GUNICORN_THREADS", "16"))
+HEDGE_WORKERS = int(os.getenv("PAYMENTS_HEDGE_WORKERS", str(4 * REQUEST_THREADS)))
+
+_local = threading.local()
+
+
+def session() -> requests.Session:
+    """This thread's Session, backed by the shared pool."""
+    s = getattr(_local, "session", None)
+    if s is None:
+        s = requests.Session()
+        s.mount("http://", ADAPTER)
+        s.mount("https://", ADAPTER)
+        _local.session = s
+    return s
+
+
+def _on_attempt(result: str, seconds: float) -> None:
+    """Called for every HTTP attempt; replaced by instrument()."""
+
+
+def _failed(ex: Exception) -> str:
+    # aiohttp raises asyncio.TimeoutError, which is TimeoutError
+    timeout = isinstance(ex, (requests.Timeout, TimeoutError))
+    return "timeout" if timeout else "error"
+
+
+def _get(key: str) -> requests.Response:
+    t0 = time.perf_counter()
+    try:
+        resp = session().get(
+            PAYMENTS_URL,
+            headers={"Idempotency-Key": key},
+            timeout=PAYMENTS_TIMEOUT,
+        )
+    except Exception as ex:
+        _on_attempt(_failed(ex), time.perf_counter() - t0)
+        raise
+    result = "5xx" if resp.status_code >= 500 else "ok"
+    _on_attempt(result, time.perf_counter() - t0)
+    return resp
+
+
+async def _get_async(session, key: str):
+    """(status code, body text) via an aiohttp.ClientSession."""
+    t0 = time.perf_counter()
+    try:
+        headers = {"Idempotency-Key": key}
+        async with session.get(PAYMENTS_URL, headers=headers) as resp:
+            status, text = resp.status, await resp.text()
+    except Exception as ex:
+        _on_attempt(_failed(ex), time.perf_counter() - t0)
+        raise
+    _on_attempt("5xx" if status >= 500 else "ok", time.perf_counter() - t0)
+    return status, text
+
+
+BREAKER = CircuitBreaker(
+    failure_threshold=BREAKER_FAILURES,
+    reset_timeout=BREAKER_RESET,
+)
+BUDGET = RetryBudget(ratio=RETRY_BUDGET)
+LATENCY = LatencyTracker(pct=HEDGE_PERCENTILE) if HEDGE else None
+
+POLICY = dict(
+    breaker=BREAKER,
+    budget=BUDGET,
+    attempts=RETRY_ATTEMPTS,
+    backoff_base=RETRY_BACKOFF,
+    deadline=RETRY_DEADLINE,
+    hedge=LATENCY,
+)
+
+_pay = Resilient(
+    _get,
+    is_failure=lambda resp: resp.status_code >= 500,
+    hedge_workers=HEDGE_WORKERS,
+    **POLICY,
+)
+_pay_async = AsyncResilient(
+    _get_async,
+    is_failure=lambda result: result[0] >= 500,
+    **POLICY,
+)
+
+
+def pay() -> requests.Response:
+    """Pay for one order; its retries and hedges share one key."""
+    return _pay(str(uuid.uuid4()))
+
+
+def pay_async(session):
+    """Awaitable: (status code, body text) for one order."""
+    return _pay_async(session, str(uuid.uuid4()))
+
+
+def instrument(on_event, on_state, on_attempt=None) -> None:
+    """Report resilience events (short_circuit, retry,
+    retry_budget_exhausted, hedge, hedge_win), circuit state changes
+    (CircuitBreaker.CLOSED/HALF_OPEN/OPEN) and, via on_attempt(result,
+    seconds), every HTTP attempt (result: ok, 5xx, timeout, error)."""
+    global _on_attempt
+    _pay.on_event = _pay_async.on_event = on_event
+    BREAKER.on_state = on_state
+    if on_attempt is not None:
+        _on_attempt = on_attempt
@@ -1,7 +1,8 @@
 from flask import Flask, request, jsonify
-import requests
 import os
 
+import payments  # pooled keep-alive client for payments-service
+
 # --- OpenTelemetry imports
 from opentelemetry import trace
 from opentelemetry.instrumentation.flask import (
@@ -51,10 +52,7 @@ def order():
 
     # Simulate a downstream call to payments-service
     try:
-        resp = requests.get(
-            "http://payments-service:8080/pay",
-            timeout=2,
-        )
+        resp = payments.pay()
         pay_status = {
             "payments_status": resp.text,
             "payments_code": resp.status_code,
@@ -0,0 +1,348 @@
+"""Resilience for a downstream call: circuit breaker, retry budget with
+jittered backoff, and (optionally) hedged requests.
+
+- CircuitBreaker: after `failure_threshold` consecutive failures the
+  circuit opens and calls fail fast (CircuitOpenError) instead of each
+  waiting out the timeout. After `reset_timeout` seconds it lets a few
+  probe calls through (half-open); one success closes it, a failure
+  opens it again.
+- RetryBudget: every call deposits `ratio` tokens and every retry or
+  hedge spends one, so retries add at most `ratio` extra load to a
+  struggling downstream instead of multiplying it.
+- Hedging: when an attempt is slower than the recent p95, a second one
+  is sent and whichever answers first wins.
+
+Resilient wraps a function (hedges run on a small thread pool);
+AsyncResilient wraps a coroutine function with the same policy.
+
+Retries and hedges resend the request, so the downstream must treat
+them as the same call (idempotent, or an idempotency key).
+"""
+
+import asyncio
+import contextvars
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Callable, Optional
+
+
+class CircuitOpenError(Exception):
+    """The circuit is open: the call was not attempted."""
+
+
+class CircuitBreaker:
+    # Also the values reported by the state gauge
+    CLOSED, HALF_OPEN, OPEN = 0, 1, 2
+
+    def __init__(
+        self,
+        failure_threshold: int = 5,
+        reset_timeout: float = 10.0,
+        half_open_probes: int = 1,
+    ):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.half_open_probes = half_open_probes
+        self.on_state: Callable[[int], None] = lambda state: None
+        self.state = self.CLOSED
+        self._failures = 0
+        self._probes = 0
+        self._opened_at = 0.0
+        self._lock = threading.Lock()
+
+    def _set(self, state: int) -> None:
+        self.state = state
+        self.on_state(state)
+
+    def allow(self) -> bool:
+        """May a call go out now? In half-open, only the probes may."""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN:
+                if time.monotonic() - self._opened_at < self.reset_timeout:
+                    return False
+                self._probes = 0
+                self._set(self.HALF_OPEN)
+            if self._probes < self.half_open_probes:
+                self._probes += 1
+                return True
+            return False
+
+    def record(self, ok: bool) -> None:
+        with self._lock:
+            # In OPEN, any answer is from a call sent before the circuit
+            # opened, arriving late: it says nothing about the downstream
+            # now. A success must not close the circuit, and a failure
+            # must not push back the half-open probe.
+            if self.state == self.OPEN:
+                return
+            if ok:
+                if self.state == self.HALF_OPEN:  # the probe succeeded
+                    self._set(self.CLOSED)
+                self._failures = 0
+                return
+            self._failures += 1
+            if (
+                self.state == self.HALF_OPEN
+                or self._failures >= self.failure_threshold
+            ):
+                self._opened_at = time.monotonic()
+                self._set(self.OPEN)
+
+
+class RetryBudget:
+    """Token bucket for retries and hedges. Starts full, so a quiet
+    service can still retry a few times."""
+
+    def __init__(self, ratio: float = 0.2, max_tokens: float = 10.0):
+        self.ratio = ratio
+        self.max_tokens = max_tokens
+        self._tokens = max_tokens
+        self._lock = threading.Lock()
+
+    def deposit(self) -> None:
+        with self._lock:
+            self._tokens = min(self.max_tokens, self._tokens + self.ratio)
+
+    def withdraw(self) -> bool:
+        with self._lock:
+            if self._tokens < 1:
+                return False
+            self._tokens -= 1
+            return True
+
+    def available(self) -> float:
+        return self._tokens
+
+
+class LatencyTracker:
+    """A percentile of the last `window` successful attempts, recomputed
+    every `every` observations rather than on every call."""
+
+    def __init__(
+        self,
+        pct: float = 95,
+        window: int = 1000,
+        every: int = 50,
+        min_samples: int = 100,
+    ):
+        self.pct = pct
+        self.every = every
+        self.min_samples = min_samples
+        self._samples: deque = deque(maxlen=window)
+        self._count = 0
+        self._value: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def observe(self, seconds: float) -> None:
+        with self._lock:
+            self._samples.append(seconds)
+            self._count += 1
+            if self._count % self.every == 0 and len(self._samples) >= self.min_samples:
+                ordered = sorted(self._samples)
+                self._value = ordered[int(len(ordered) * self.pct / 100) - 1]
+
+    def value(self) -> Optional[float]:
+        """None until there are min_samples observations."""
+        return self._value
+
+
+def backoff(attempt: int, base: float, cap: float) -> float:
+    """Full jitter: uniform in [0, base * 2^attempt], capped. Spreads
+    retries out so callers that failed together don't retry together."""
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+class Resilient:
+    """Wraps `call` with the breaker, retries within the budget and the
+    deadline, and hedging when `hedge` is a LatencyTracker. Arguments
+    are passed through to `call`.
+
+    `is_failure(result)` marks results that count as failures (e.g. HTTP
+    5xx). They are retried, and returned if no retry is left. Exceptions
+    are re-raised once no retry is left.
+    """
+
+    def __init__(
+        self,
+        call: Callable[..., Any],
+        breaker: CircuitBreaker,
+        budget: RetryBudget,
+        is_failure: Callable[[Any], bool] = lambda result: False,
+        attempts: int = 2,
+        backoff_base: float = 0.05,
+        backoff_cap: float = 1.0,
+        deadline: float = 2.0,
+        hedge: Optional[LatencyTracker] = None,
+        hedge_min_delay: float = 0.01,
+        hedge_workers: int = 32,
+    ):
+        self.call = call
+        self.breaker = breaker
+        self.budget = budget
+        self.is_failure = is_failure
+        self.attempts = attempts
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.deadline = deadline
+        self.hedge = hedge
+        self.hedge_min_delay = hedge_min_delay
+        # Event names: short_circuit, retry, retry_budget_exhausted, hedge, hedge_win
+        self.on_event: Callable[[str], None] = lambda name: None
+        self._pool = self._make_pool(hedge_workers) if hedge is not None else None
+
+    def _make_pool(self, workers: int):
+        return ThreadPoolExecutor(workers, thread_name_prefix="hedge")
+
+    # --- Policy, shared with AsyncResilient
+    def _admit(self) -> None:
+        if not self.breaker.allow():
+            self.on_event("short_circuit")
+            raise CircuitOpenError("circuit open")
+        self.budget.deposit()
+
+    def _retry_delay(self, attempt: int, start: float) -> Optional[float]:
+        """Seconds to wait before retry number `attempt`, or None."""
+        delay = backoff(attempt, self.backoff_base, self.backoff_cap)
+        # Never retry past the deadline: a timed-out attempt isn't retried
+        if (
+            attempt >= self.attempts
+            or time.monotonic() - start + delay >= self.deadline
+        ):
+            return None
+        if not self.budget.withdraw():
+            self.on_event("retry_budget_exhausted")
+            return None
+        if not self.breaker.allow():
+            self.on_event("short_circuit")
+            return None
+        self.on_event("retry")
+        return delay
+
+    def _hedge_delay(self) -> Optional[float]:
+        delay = self.hedge.value() if self.hedge is not None else None
+        return None if delay is None else max(delay, self.hedge_min_delay)
+
+    def _observe(self, result: Any, t0: float) -> None:
+        if self.hedge is not None and not self.is_failure(result):
+            self.hedge.observe(time.perf_counter() - t0)
+
+    def _ok(self, future) -> bool:
+        return future.exception() is None and not self.is_failure(future.result())
+
+    # --- Sync calls
+    def __call__(self, *args) -> Any:
+        self._admit()
+        start = time.monotonic()
+        attempt = 0
+        while True:
+            try:
+                result, error = self._attempt(*args), None
+                failed = self.is_failure(result)
+            except Exception as ex:
+                result, error, failed = None, ex, True
+            self.breaker.record(not failed)
+            if not failed:
+                return result
+            attempt += 1
+            delay = self._retry_delay(attempt, start)
+            if delay is None:
+                break
+            time.sleep(delay)
+        if error is not None:
+            raise error
+        return result
+
+    def _timed(self, *args) -> Any:
+        t0 = time.perf_counter()
+        result = self.call(*args)
+        self._observe(result, t0)
+        return result
+
+    def _submit(self, *args):
+        # Pool threads don't inherit contextvars: run the attempt in a copy
+        # of the caller's context, so it stays inside the request's span
+        return self._pool.submit(contextvars.copy_context().run, self._timed, *args)
+
+    def _attempt(self, *args) -> Any:
+        delay = self._hedge_delay()
+        if delay is None:
+            return self._timed(*args)
+        first = self._submit(*args)
+        done, _ = wait([first], timeout=delay)
+        if done or not self.budget.withdraw():
+            return first.result()
+        self.on_event("hedge")
+        second = self._submit(*args)
+        pending = {first, second}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for f in sorted(done, key=self._ok, reverse=True):
+                ok = self._ok(f)
+                if ok or not pending:
+                    if ok and f is second:
+                        self.on_event("hedge_win")
+                    # The slower attempt finishes in the background
+                    return f.result()
+
+
+class AsyncResilient(Resilient):
+    """Resilient for a coroutine function; same policy, awaited. A losing
+    hedge is cancelled instead of left running."""
+
+    def _make_pool(self, workers: int):
+        return None
+
+    async def __call__(self, *args) -> Any:
+        self._admit()
+        start = time.monotonic()
+        attempt = 0
+        while True:
+            try:
+                result, error = await self._attempt(*args), None
+                failed = self.is_failure(result)
+            except Exception as ex:
+                result, error, failed = None, ex, True
+            self.breaker.record(not failed)
+            if not failed:
+                return result
+            attempt += 1
+            delay = self._retry_delay(attempt, start)
+            if delay is None:
+                break
+            await asyncio.sleep(delay)
+        if error is not None:
+            raise error
+        return result
+
+    async def _timed(self, *args) -> Any:
+        t0 = time.perf_counter()
+        result = await self.call(*args)
+        self._observe(result, t0)
+        return result
+
+    async def _attempt(self, *args) -> Any:
+        delay = self._hedge_delay()
+        if delay is None:
+            return await self._timed(*args)
+        first = asyncio.ensure_future(self._timed(*args))
+        done, _ = await asyncio.wait({first}, timeout=delay)
+        if done or not self.budget.withdraw():
+            return await first
+        self.on_event("hedge")
+        second = asyncio.ensure_future(self._timed(*args))
+        pending = {first, second}
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for f in sorted(done, key=self._ok, reverse=True):
+                ok = self._ok(f)
+                if ok or not pending:
+                    if ok and f is second:
+                        self.on_event("hedge_win")
+                    for p in pending:
+                        p.cancel()
+                    return f.result()
@@ -0,0 +1,52 @@
+"""gunicorn config for the orders service: several worker processes,
+with one merged set of Prometheus metrics.
+
+prometheus_client keeps metrics per process, so with more than one
+worker a scrape of /metrics would only see the worker that answered
+it. In multiprocess mode each worker writes its metrics to mmap'd files
+in PROMETHEUS_MULTIPROC_DIR, and the master serves them merged on
+METRICS_PORT: scrapes never take a worker thread from /order.
+
+  gunicorn -c gunicorn.conf.py app:app
+  gunicorn -c gunicorn.conf.py -k uvicorn.workers.UvicornWorker async_app:app
+"""
+
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8080')}"
+workers = int(os.getenv("GUNICORN_WORKERS", "2"))
+worker_class = "gthread"
+threads = int(os.getenv("GUNICORN_THREADS", "16"))
+
+METRICS_PORT = int(os.getenv("METRICS_PORT", "9100"))
+# Set before any process imports prometheus_client; workers inherit it
+METRICS_DIR = os.environ.setdefault(
+    "PROMETHEUS_MULTIPROC_DIR",
+    "/tmp/orders-metrics",
+)
+
+
+def on_starting(server):
+    # Files from a previous run would be added to this run's counters.
+    # Empty the directory rather than removing it: it may be a mount.
+    os.makedirs(METRICS_DIR, exist_ok=True)
+    for name in os.listdir(METRICS_DIR):
+        os.remove(os.path.join(METRICS_DIR, name))
+
+
+def when_ready(server):
+    from prometheus_client import CollectorRegistry, start_http_server
+    from prometheus_client.multiprocess import MultiProcessCollector
+
+    registry = CollectorRegistry()
+    MultiProcessCollector(registry)
+    start_http_server(METRICS_PORT, registry=registry)
+    server.log.info("Serving metrics on port %s", METRICS_PORT)
+
+
+def child_exit(server, worker):
+    # Drop the dead worker's live gauges; its counters and histograms
+    # stay in the totals
+    from prometheus_client import multiprocess
+
+    multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,178 @@
+"""Prometheus metric objects shared by app.py (Flask) and async_app.py
+(asyncio), so both export the same series.
+
+Request metrics follow RED (rate, errors, duration) per route and
+status code; both apps record them from a before/after-request hook via
+RED.observe(). Label children are resolved once, up front, so recording
+a request does dict lookups instead of Counter.labels() calls.
+
+Under gunicorn (see gunicorn.conf.py) PROMETHEUS_MULTIPROC_DIR is
+set and every worker writes these metrics to files there; REGISTRY then
+merges all workers' files, so /metrics reports the service's totals.
+"""
+
+import os
+
+import prometheus_client
+from prometheus_client import (
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    multiprocess,
+)
+
+import payments
+
+
+def _buckets(env, default):
+    """Histogram buckets in seconds from a comma-separated env var."""
+    value = os.getenv(env)
+    if not value:
+        return default
+    return tuple(sorted(float(b) for b in value.split(",")))
+
+
+# Our range: ~50 ms orders, up to the 2 s payments timeout (+ a retry)
+REQUEST_BUCKETS = _buckets(
+    "ORDERS_LATENCY_BUCKETS",
+    (0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.15, 0.2, 0.3,
+     0.5, 0.75, 1.0, 1.5, 2.0, 3.0, 5.0),
+)
+PAYMENTS_BUCKETS = _buckets(
+    "PAYMENTS_LATENCY_BUCKETS",
+    (0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.15, 0.2, 0.3,
+     0.5, 0.75, 1.0, 1.5, 2.0),
+)
+
+# --- Registry to expose
+if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+    REGISTRY = CollectorRegistry()
+    multiprocess.MultiProcessCollector(REGISTRY)
+else:
+    REGISTRY = prometheus_client.REGISTRY
+
+# --- Prometheus metric objects
+REQS = Counter(
+    "orders_requests_total",
+    "Requests handled",
+    ["route", "status"],
+)
+ERRS = Counter(
+    "orders_errors_total",
+    "Failed requests: 5xx, or an order whose downstream call failed",
+    ["route", "status"],
+)
+LAT = Histogram(
+    "orders_request_seconds",
+    "Request latency",
+    ["route", "status"],
+    buckets=REQUEST_BUCKETS,
+)
+# Each HTTP attempt to payments-service (retries and hedges included).
+# result: ok, 5xx, timeout or error (could not connect, reset, ...)
+PAYMENTS_LAT = Histogram(
+    "orders_payments_request_seconds",
+    "Latency of calls to payments-service",
+    ["result"],
+    buckets=PAYMENTS_BUCKETS,
+)
+PAYMENTS_LAT_BY_RESULT = {
+    result: PAYMENTS_LAT.labels(result)
+    for result in ("ok", "5xx", "timeout", "error")
+}
+
+# Requests that don't match a route share one label value, so scanners
+# can't create a series per path
+UNMATCHED = "unmatched"
+STATUSES = (200, 400, 404, 405, 500, 502, 503)
+
+
+class RedMetrics:
+    """(route, status) -> the REQS, ERRS and LAT children. Known routes
+    and common statuses are resolved up front; anything else once, on
+    first use."""
+
+    def __init__(self, routes, statuses=STATUSES):
+        self._children = {}
+        for route in [*routes, UNMATCHED]:
+            for status in statuses:
+                self._resolve(route, status)
+
+    def _resolve(self, route, status):
+        labels = (route, str(status))
+        children = (
+            REQS.labels(*labels),
+            ERRS.labels(*labels),
+            LAT.labels(*labels),
+        )
+        self._children[(route, status)] = children
+        return children
+
+    def observe(self, route, status, seconds, failed=False):
+        """Record one request; `route` is the rule (e.g. /order) or None."""
+        key = (route or UNMATCHED, status)
+        children = self._children.get(key) or self._resolve(*key)
+        reqs, errs, lat = children
+        reqs.inc()
+        lat.observe(seconds)
+        if failed or status >= 500:
+            errs.inc()
+
+
+# --- Payments resilience (see payments.py, resilience.py)
+# Each worker process has its own circuit and budget: the gauges report
+# the worst live worker (multiprocess_mode is ignored in one process)
+PAYMENTS_CIRCUIT = Gauge(
+    "orders_payments_circuit_state",
+    "payments-service circuit: 0 closed, 1 half-open, 2 open",
+    multiprocess_mode="livemax",
+)
+PAYMENTS_EVENTS = {
+    "short_circuit": Counter(
+        "orders_payments_short_circuited_total",
+        "Payments calls failed fast by the open circuit",
+    ),
+    "retry": Counter(
+        "orders_payments_retries_total",
+        "Payments calls retried",
+    ),
+    "retry_budget_exhausted": Counter(
+        "orders_payments_retry_budget_exhausted_total",
+        "Payments retries skipped because the budget was spent",
+    ),
+    "hedge": Counter(
+        "orders_payments_hedges_total",
+        "Hedged payments requests sent",
+    ),
+    "hedge_win": Counter(
+        "orders_payments_hedge_wins_total",
+        "Hedged payments requests that answered first",
+    ),
+}
+PAYMENTS_RETRY_TOKENS = Gauge(
+    "orders_payments_retry_budget_tokens",
+    "Retries/hedges the budget allows right now",
+    multiprocess_mode="livemin",
+)
+PAYMENTS_HEDGE_DELAY = Gauge(
+    "orders_payments_hedge_delay_seconds",
+    "Delay before a hedged request (0: hedging off or warming up)",
+    multiprocess_mode="livemax",
+)
+
+
+def _on_attempt(result, seconds):
+    PAYMENTS_LAT_BY_RESULT[result].observe(seconds)
+    # Set on every attempt rather than with set_function(): the merged
+    # scrape runs in another process and can't call it
+    PAYMENTS_RETRY_TOKENS.set(payments.BUDGET.available())
+    PAYMENTS_HEDGE_DELAY.set((payments.LATENCY and payments.LATENCY.value()) or 0)
+
+
+PAYMENTS_RETRY_TOKENS.set(payments.BUDGET.available())
+payments.instrument(
+    on_event=lambda name: PAYMENTS_EVENTS[name].inc(),
+    on_state=PAYMENTS_CIRCUIT.set,
+    on_attempt=_on_attempt,
+)
@@ -0,0 +1,81 @@
+"""Local stand-in for payments-service, for benchmarks and load tests.
+
+Answers GET on any path after --delay ms (the Node service takes
+~50 ms), with HTTP/1.1 keep-alive. GET /_connections returns how many
+TCP connections it has accepted, so a benchmark can show connection
+reuse. Run it as its own process, so it doesn't share a GIL with the
+client being measured.
+
+  python stub_payments.py --port 8090 --delay 50
+  PAYMENTS_URL=http://127.0.0.1:8090/pay python app.py
+"""
+
+import argparse
+import socket
+import subprocess
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024
+
+    def __init__(self, port: int, delay: float, body: bytes = b"Payment processed"):
+        self.delay = delay
+        self.body = body
+        self.connections = 0
+        self._lock = threading.Lock()
+        super().__init__(("127.0.0.1", port), _Handler)
+
+    def process_request(self, request, client_address):
+        with self._lock:
+            self.connections += 1
+        super().process_request(request, client_address)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+    # Headers and body go out in separate writes; with Nagle on, a reused
+    # connection stalls on the client's delayed ACK (Node sets TCP_NODELAY too)
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        if self.path == "/_connections":
+            body = str(self.server.connections).encode()
+        else:
+            time.sleep(self.server.delay)
+            body = self.server.body
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def spawn(port: int, delay_ms: float) -> subprocess.Popen:
+    """Start the stub as a child process and wait until it accepts connections."""
+    proc = subprocess.Popen(
+        [sys.executable, __file__, "--port", str(port), "--delay", str(delay_ms)],
+    )
+    deadline = time.monotonic() + 10
+    while time.monotonic() < deadline:
+        with socket.socket() as s:
+            if s.connect_ex(("127.0.0.1", port)) == 0:
+                return proc
+        time.sleep(0.05)
+    proc.kill()
+    raise RuntimeError(f"stub did not start on port {port}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Stub payments-service")
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--delay", type=float, default=50, help="ms per request")
+    args = parser.parse_args()
+    StubServer(args.port, args.delay / 1000).serve_forever()